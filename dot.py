@@ -8,9 +8,19 @@ Note: These functions only work with basic .dot-files - no styling, no labels ,
    See './small_graphs_dot' for examples and 'https://graphviz.org/' for further information.
 """
 
-from graphviz import Source, Graph as DGraph
+import mmap
+from pathlib import Path
+from sys import intern
+
+from graphviz import Source, view
 from md import *
 
+# A translation table that deletes all whitespace characters
+_WS_TABLE = str.maketrans('', '', ' \t\r\n\v\f')
+
+# The size (in bytes) from which on .dot-files are memory-mapped when being read
+_MMAP_THRESHOLD = 1 << 20
+
 
 def path_to_dot(dot_path):
     """A function that reads the string from a .dot-file and returns it.
@@ -22,10 +32,14 @@ def path_to_dot(dot_path):
         The string contained in the .dot-file.
     """
 
-    dot_file = open(dot_path)
-    dot_str = dot_file.read()
-    dot_file.close()
-    return dot_str
+    path = Path(dot_path)
+
+    # Large files (as produced by the graph generators) are memory-mapped and decoded in one go
+    if path.stat().st_size > _MMAP_THRESHOLD:
+        with open(path, 'rb') as dot_file, mmap.mmap(dot_file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return mm[:].decode('utf-8')
+
+    return path.read_text(encoding='utf-8')
 
 
 def render_graph(dot_path, graph_name, engine_="dot", show=True):
@@ -74,26 +88,35 @@ def dot_to_graph(dot_str):
         A 'Graph' object representing the graph.
     """
 
-    # Get rid of all the duplicate whitespaces and newline characters
-    without_whitespace = "".join(dot_str.split())
+    # Get rid of all the whitespaces and newline characters in a single pass
+    without_whitespace = dot_str.translate(_WS_TABLE)
 
-    # Find indices of opening and closing bracket
+    # Find indices of opening and (last) closing bracket
     open_bracket_idx = without_whitespace.find("{")
-    close_bracket_idx = without_whitespace.find("}")
+    close_bracket_idx = without_whitespace.rfind("}")
 
     if open_bracket_idx == -1 or close_bracket_idx == -1:
         raise Exception("no brackets found")
 
-    # Get the string describing the graph (nodes / edges) and divide it by the semicolons
+    # Get the string describing the graph (nodes / edges)
     content = without_whitespace[open_bracket_idx + 1:close_bracket_idx - 1]
-    lines = content.split(";")
 
-    # Build the graph
+    # Build the graph from the statements (separated by semicolons)
     graph = Graph()
-    for l in lines:
-        nodes = l.split("--")
-        for v in nodes:
-            graph.add_node(Node(v))
+    for statement in content.split(";"):
+        # Skip empty statements (e.g. after the last semicolon); the whitespace is already gone
+        if not statement:
+            continue
+
+        # A single node
+        if "--" not in statement:
+            node_id = intern(statement)
+            if node_id not in graph.nodes:
+                graph.add_node(Node(node_id))
+            continue
+
+        # A chain of edges
+        nodes = [intern(v) for v in statement.split("--")]
         for i in range(0, len(nodes) - 1):
             graph.add_edge(nodes[i], nodes[i + 1])
 
@@ -109,24 +132,26 @@ def tree_to_dot(tree, tree_name, show=True):
         tree: The 'Tree' object describing a modular decomposition tree.
         tree_name: The name of the tree (corresponding to a graph) used for naming the .dot-file.
         show: A boolean. If true the tree is rendered as a .pdf-file.
-
     """
 
     all_nodes = list(tree)  # A list of all the nodes contained in the tree
-    dot = DGraph()  # A directed graph (.dot)
 
-    for p in tree:
-        # Label the nodes in the .dot-file by either their type (modules) or their id (leaves)
-        parent_label = p.type.name if not (p.type is Type.NODE) else p.node.id
+    # Use the index of a node in 'all_nodes' as a key to differentiate between nodes (modules) of the same type.
+    # The indices are looked up by identity instead of scanning 'all_nodes' for every parent and child.
+    node_idx = {id(t_node): i for i, t_node in enumerate(all_nodes)}
 
-        # Create a node.
-        # Use the index of the node in 'all_nodes' as a key to differentiate between nodes (modules) of the same type
-        dot.node(str(all_nodes.index(p)), parent_label)
+    # Write the .dot-source directly, emitting every node and every edge exactly once
+    lines = ["graph {\n"]
+    for i, p in enumerate(all_nodes):
+        # Label the nodes in the .dot-file by either their type (modules) or their id (leaves)
+        label = p.type.name if not (p.type is Type.NODE) else p.node.id
+        lines.append('\t' + str(i) + ' [label="' + str(label).replace('"', '\\"') + '"]\n')
 
         for c in p.children:
-            child_label = c.type.name if not (c.type is Type.NODE) else c.node.id
-            dot.node(str(all_nodes.index(c)), child_label)  # Create a node
-            dot.edge(str(all_nodes.index(p)), str(all_nodes.index(c)))  # Create an edge
+            lines.append('\t' + str(i) + ' -- ' + str(node_idx[id(c)]) + '\n')
+    lines.append("}\n")
+
+    dot = Source("".join(lines))
 
     tree_path = "./md_trees/" + tree_name + ".dot"
     if show:
@@ -147,28 +172,33 @@ def write_graph_to_dot(graph, graph_name, show=True, engine_="dot"):  # and rend
             engine_: The rendering-engine used to render the .pdf-file.
     """
 
-    dot_str = "graph\n{\n"
     nodes = list(graph.get_nodes())
+
+    # A dense index per node, used to emit every edge exactly once
+    node_rank = {node.id: i for i, node in enumerate(nodes)}
+
+    # Collect the lines of the .dot-file in a list instead of repeatedly concatenating strings
+    parts = ["graph\n{\n"]
     number_nodes, number_edges = 0, 0
     for node in nodes:
         number_nodes += 1
-        dot_str += node.id + ";\n"
+        parts.append(node.id + ";\n")
+        node_rank_ = node_rank[node.id]
         for neighbor in node.adjacent:
-            if neighbor.id > node.id:
+            if node_rank[neighbor.id] > node_rank_:
                 number_edges += 1
-                dot_str += node.id + "--" + neighbor.id + ";\n"
-    dot_str += "}"
+                parts.append(node.id + "--" + neighbor.id + ";\n")
+    parts.append("}")
+
     graph_file_name = "./graphs/" + graph_name + ".dot"
-    graph_dot_file = open(graph_file_name, 'w')
-    graph_dot_file.write(dot_str)
-    graph_dot_file.close()
+    with open(graph_file_name, 'w', buffering=1 << 20) as graph_dot_file:
+        graph_dot_file.writelines(parts)
 
-    graph_name = graph_name
-    source = Source(dot_str, engine=engine_)  # engines: dot, neato, fdp, sfdp, twopi, circo, (osage, patchwork)
-    render_to_path = "./graphs/" + graph_name + ".dot"
+    # The .dot-file has already been written, so only the .pdf-file is created from the source held in memory
     if show:
-        source.render(render_to_path, view=True)  # Also creates .dot-file
-    else:
-        source.save(render_to_path)
+        source = Source("".join(parts), engine=engine_)  # engines: dot, neato, fdp, sfdp, twopi, circo
+        pdf_path = graph_file_name + ".pdf"
+        Path(pdf_path).write_bytes(source.pipe(format='pdf'))
+        view(pdf_path)
 
     return number_nodes, number_edges
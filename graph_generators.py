@@ -5,10 +5,22 @@ This module implements various functions for generating graphs.
 Note: 'random_graph()' and 'mw_bound_graph2()' can be used through the text-user-interface.
 """
 
-from random import random, choice, randint
+from functools import lru_cache
+from itertools import islice
+from math import isqrt, log
+from random import random, randint, randrange, sample
+from sys import intern
 from dot import *
 
 
+# Interned ids for the nodes of small graphs
+INT_IDS = [intern(str(i)) for i in range(1024)]
+
+
+def int_id(i):  # the (interned) id of the node with number i
+    return INT_IDS[i] if i < len(INT_IDS) else intern(str(i))
+
+
 class Mode(Enum):
     """Labels for the assembly mode"""
     WIDE = auto()
@@ -19,19 +31,37 @@ class Mode(Enum):
 def random_graph(graph_order, edge_probability=0.5):  # binomial random graph
     graph = Graph()
 
-    for u in range(graph_order):
-        graph.add_node(Node(str(u + 1)))
-
-    for u in range(graph_order):
-        for v in range(u + 1, graph_order):
-            if random() < edge_probability:
-                graph.add_edge(str(u + 1), str(v + 1))
+    nodes = [Node(int_id(u + 1)) for u in range(graph_order)]
+    for node in nodes:
+        graph.add_node(node)
+
+    # The nodes are connected directly, without looking up their ids in the graph
+    if edge_probability >= 1:
+        for u in range(graph_order):
+            for v in range(u + 1, graph_order):
+                nodes[u].adjacent.add(nodes[v])
+                nodes[v].adjacent.add(nodes[u])
+
+    elif edge_probability > 0:
+        # Instead of drawing a random number for every pair of nodes, skip over the pairs that are not connected
+        # by drawing geometrically distributed gaps (Batagelj & Brandes, 2005). This takes O(n + m) time.
+        log_q = log(1 - edge_probability)
+        v, w = 1, -1
+        while v < graph_order:
+            w += 1 + int(log(1 - random()) / log_q)
+            while w >= v and v < graph_order:
+                w -= v
+                v += 1
+            if v < graph_order:
+                nodes[w].adjacent.add(nodes[v])
+                nodes[v].adjacent.add(nodes[w])
 
     graph_name = str(graph_order) + "_" + str(edge_probability)
     return graph, graph_name
 
 
-def mw_bound_graph2(graph_order, lo_mw_bound, hi_mw_bound, edge_probability=0.5, mode=Mode.RANDOM):
+def mw_bound_graph2(graph_order, lo_mw_bound, hi_mw_bound, edge_probability=0.5, mode=Mode.RANDOM,
+                    reuse_modules=False):
     module_sizes = []
     while sum(module_sizes) - len(module_sizes) + 1 < graph_order:
         module_sizes.append(randint(lo_mw_bound, hi_mw_bound))
@@ -48,7 +78,7 @@ def mw_bound_graph2(graph_order, lo_mw_bound, hi_mw_bound, edge_probability=0.5,
                 diff = diff - last
 
     module_sizes.reverse()  # to keep derivation from mw bounds in leaves
-    graphs = [random_prime_graph(mw, edge_probability)[0] for mw in module_sizes]
+    graphs = random_prime_graphs(module_sizes, edge_probability, reuse_modules)
     uniquify_node_ids(graphs)
     graph = assemble_graph(graphs, mode)
     flatten_node_ids(graph)  # TODO better to not flatten to identify modules?
@@ -59,11 +89,38 @@ def mw_bound_graph2(graph_order, lo_mw_bound, hi_mw_bound, edge_probability=0.5,
     return graph, graph_name
 
 
-def is_prime(graph):  # TODO: prime labelling problem? wtf!
+def md_is_prime(graph):  # TODO: prime labelling problem? wtf!
     tree = md_tree(graph)
     return tree.type == Type.PRIME and len(tree.children) == len(graph.get_nodes())
 
 
+def graph_key(graph):  # a hashable key that identifies a (labelled) graph
+    edges = frozenset((node.id, neighbor.id) for node in graph.get_nodes() for neighbor in node.adjacent
+                      if node.id < neighbor.id)
+    return frozenset(graph.nodes), edges
+
+
+@lru_cache(maxsize=8192)
+def is_prime_by_key(key):  # 'md_is_prime()' for the graph identified by 'key' (see 'graph_key()'), memoized
+    node_ids, edges = key
+    graph = Graph()
+    for node_id in node_ids:
+        graph.add_node(Node(node_id))
+    for u_id, v_id in edges:
+        graph.add_edge(u_id, v_id)
+    return md_is_prime(graph)
+
+
+# Up to this order, the same labelled graphs are tested repeatedly, so the primality tests are memoized
+PRIME_CACHE_MAX_ORDER = 7
+
+
+def is_prime(graph):
+    if len(graph.nodes) <= PRIME_CACHE_MAX_ORDER:
+        return is_prime_by_key(graph_key(graph))
+    return md_is_prime(graph)
+
+
 def random_prime_graph(graph_order, edge_probability=0.5):  # might return a cograph, if graph order is < 4
     # print(graph_order, "...")
     if graph_order < 4:
@@ -77,35 +134,50 @@ def random_prime_graph(graph_order, edge_probability=0.5):  # might return a cog
             return graph, graph_name
 
 
+def random_prime_graphs(module_sizes, edge_probability=0.5, reuse=False):
+    # a random prime graph for each module size.
+    # if 'reuse' is set, only one prime graph is generated per size and cloned for repeated sizes.
+    if not reuse:
+        return [random_prime_graph(mw, edge_probability)[0] for mw in module_sizes]
+
+    templates = {}
+    graphs = []
+    for mw in module_sizes:
+        if mw in templates:
+            graphs.append(templates[mw].clone())
+        else:
+            templates[mw] = random_prime_graph(mw, edge_probability)[0]
+            graphs.append(templates[mw])
+    return graphs
+
+
 def uniquify_node_ids(graphs):
     # unique ids (node.id and(!!) keys in graph.nodes)
     for i, graph in enumerate(graphs):
-        for node in graph.get_nodes():
-            old_node_id = node.id
-            node.id = str(i + 1) + "." + node.id  # new unique node.id (+ 1 --> start ids at "1")
-            graph.nodes[node.id] = graph.nodes[old_node_id]  # new dict entry under new id
-            del graph.nodes[old_node_id]  # delete old entry
+        new_nodes = {}  # rebuild the dict in one pass instead of inserting/deleting an entry per node
+        for node in graph.nodes.values():
+            node.id = intern(str(i + 1) + "." + node.id)  # new unique node.id (+ 1 --> start ids at "1")
+            new_nodes[node.id] = node
+        graph.nodes = new_nodes
 
 
 def flatten_node_ids(graph):
-    for i, node in enumerate(list(graph.get_nodes())):
-        old_node_id = node.id
-        node.id = str(i + 1)
-        graph.nodes[node.id] = graph.nodes[old_node_id]  # new dict entry under new id
-        del graph.nodes[old_node_id]  # delete old entry
+    new_nodes = {}  # rebuild the dict in one pass instead of inserting/deleting an entry per node
+    for i, node in enumerate(graph.nodes.values(), 1):
+        node.id = int_id(i)
+        new_nodes[node.id] = node
+    graph.nodes = new_nodes
 
 
 def replace_node_in_the_graph_with_graph(the_graph, node, graph):
     # add edges from each new_node in graph_to_insert TO each of node's neighbors in the_graph
-    for new_node in graph.get_nodes():
+    # (the edges between the nodes in graph_to_insert are already contained in their adjacency sets)
+    neighbors = node.adjacent
+    for new_node in graph.nodes.values():
         the_graph.add_node(new_node)
-        for neighbor in node.adjacent:
-            the_graph.add_edge(new_node.id, neighbor.id)  # TODO doesnt add nodes if node doesnt have neighbors
-
-    # add the edges between nodes in graph_to_insert TO the_graph
-    for new_node in graph.get_nodes():
-        the_graph.nodes.get(new_node.id).adjacent = the_graph.nodes.get(new_node.id).adjacent.union(
-            new_node.adjacent)
+        new_node.adjacent |= neighbors
+        for neighbor in neighbors:
+            neighbor.adjacent.add(new_node)
 
     the_graph.remove_node(node.id)
 
@@ -123,35 +195,46 @@ def random_cograph(graph_order, edge_probability=0.5, mode=Mode.RANDOM):
         return cograph, graph_name
 
 
+def random_node(graph):  # pick a node uniformly at random without copying the graph's nodes into a tuple
+    return next(islice(graph.nodes.values(), randrange(len(graph.nodes)), None))
+
+
+def assemble_wide(the_graph, graphs, state):
+    # assemble the graph so, that its md tree is as wide as possible.
+    for node in list(the_graph.get_nodes()):
+        if len(graphs) == 0:
+            break
+        replace_node_in_the_graph_with_graph(the_graph, node, graphs.pop())
+
+
+def assemble_random(the_graph, graphs, state):
+    # assemble the graph in a random manner.
+    # the resulting md tree is potentially deeper than in WIDE mode, but shallower than in DEEP mode.
+    node = random_node(the_graph)
+    replace_node_in_the_graph_with_graph(the_graph, node, graphs.pop())
+
+
+def assemble_deep(the_graph, graphs, state):
+    # assemble the graph so, that its md tree is as deep as possible.
+    if state['temp'] is None:
+        state['temp'] = graphs[-1]
+        node = random_node(the_graph)
+        replace_node_in_the_graph_with_graph(the_graph, node, graphs.pop())
+    else:
+        node_id = random_node(state['temp']).id
+        state['temp'] = graphs[-1]
+        replace_node_in_the_graph_with_graph(the_graph, the_graph.nodes[node_id], graphs.pop())
+
+
+ASSEMBLY_STEPS = {Mode.WIDE: assemble_wide, Mode.RANDOM: assemble_random, Mode.DEEP: assemble_deep}
+
+
 def assemble_graph(graphs, mode):
     the_graph = graphs.pop()
-    i = 0
+    step = ASSEMBLY_STEPS[mode]  # the mode is fixed, so select the assembly step once
+    state = {'temp': None}  # the graph inserted last (DEEP mode)
     while len(graphs) != 0:
-        if mode == Mode.WIDE:
-            # assemble the graph so, that its md tree is as wide as possible.
-            for node in list(the_graph.get_nodes()):
-                if len(graphs) == 0:
-                    break
-                replace_node_in_the_graph_with_graph(the_graph, node, graphs.pop())
-
-        if mode == Mode.RANDOM:
-            i += 1
-            # assemble the graph in a random manner.
-            # the resulting md tree is potentially deeper than in WIDE mode, but shallower than in DEEP mode.
-            node = choice(tuple(the_graph.get_nodes()))
-            replace_node_in_the_graph_with_graph(the_graph, node, graphs.pop())
-
-        if mode == Mode.DEEP:
-            # assemble the graph so, that its md tree is as deep as possible.
-            if i == 0:
-                temp = graphs[-1]
-                node = choice(tuple(the_graph.get_nodes()))
-                replace_node_in_the_graph_with_graph(the_graph, node, graphs.pop())
-                i += 1
-            else:
-                node_id = choice(tuple(temp.get_nodes())).id
-                temp = graphs[-1]
-                replace_node_in_the_graph_with_graph(the_graph, the_graph.nodes[node_id], graphs.pop())
+        step(the_graph, graphs, state)
 
     return the_graph
 
@@ -179,7 +262,7 @@ def mw_fractal_graph(graph_order, modular_width, edge_probability=0.5, mode=Mode
     return the_graph, graph_name
 
 
-def mw_bound_graph(graph_order, modular_width_bound, edge_probability=0.5, mode=Mode.RANDOM):
+def mw_bound_graph(graph_order, modular_width_bound, edge_probability=0.5, mode=Mode.RANDOM, reuse_modules=False):
     module_sizes = []
     while sum(module_sizes) - len(module_sizes) + 1 < graph_order:
         module_sizes.append(randint(1, modular_width_bound))
@@ -195,7 +278,7 @@ def mw_bound_graph(graph_order, modular_width_bound, edge_probability=0.5, mode=
                 last = module_sizes.pop()
                 diff = diff - last
 
-    graphs = [random_prime_graph(mw, edge_probability)[0] for mw in module_sizes]
+    graphs = random_prime_graphs(module_sizes, edge_probability, reuse_modules)
     uniquify_node_ids(graphs)
     graph = assemble_graph(graphs, mode)
     flatten_node_ids(graph)
@@ -207,23 +290,18 @@ def mw_bound_graph(graph_order, modular_width_bound, edge_probability=0.5, mode=
 def uniform_random_graph(graph_order, number_of_edges):
     graph = Graph()
 
-    for u in range(graph_order):
-        graph.add_node(Node(str(u + 1)))
-
-    edges = set()
-    while len(edges) < number_of_edges:
-        u = randint(1, graph_order)
-        v = randint(1, graph_order)
-        if u == v:
-            continue
-        if v < u:
-            temp = u
-            u = v
-            v = temp
-        edges.add((str(u), str(v)))
-
-    for e in edges:
-        graph.add_edge(*e)
+    nodes = [Node(int_id(u + 1)) for u in range(graph_order)]
+    for node in nodes:
+        graph.add_node(node)
+
+    # Sample the edges as distinct indices into the list of all node pairs, instead of rejection sampling
+    # The index k of the pair {u, v}, v < u, is u * (u - 1) / 2 + v
+    # The nodes are connected directly, without converting their indices to ids and looking the ids up in the graph
+    for k in sample(range(graph_order * (graph_order - 1) // 2), number_of_edges):
+        u = (1 + isqrt(1 + 8 * k)) // 2
+        v = k - u * (u - 1) // 2
+        nodes[u].adjacent.add(nodes[v])
+        nodes[v].adjacent.add(nodes[u])
 
     graph_name = str(graph_order) + "_" + str(number_of_edges)
     return graph, graph_name
@@ -7,12 +7,10 @@ Breadth-First Search to Modular Decomposition, Split Decomposition, and Circle G
 (2011, pages 33-62).
 """
 
-from collections import namedtuple
+from collections import deque, namedtuple
 from enum import Enum, auto
-from itertools import groupby
-from sys import setrecursionlimit
-
-setrecursionlimit(10 ** 6)
+from itertools import chain, count, groupby
+from operator import attrgetter
 
 
 class Label(Enum):
@@ -35,6 +33,15 @@ class Connectivity(Enum):
     CO_COMPONENT = auto()
 
 
+# The types returned by 'pivot_factorizing_permutation()' (declared once, not on every call)
+CoComponent = namedtuple('CoComponent', 'co_component, mu')
+Component = namedtuple('Component', 'component, mu, rho')
+PivotFactorizingPermutation = namedtuple('PivotFactorizingPermutation', 'pivot, co_components, components')
+
+# The indices assigned to newly created nodes
+_node_indices = count()
+
+
 class Node:
     """A class used to represent a node in a graph.
 
@@ -44,8 +51,12 @@ class Node:
             alpha: A subset of nodes that are adjacent to a node.
                 Nodes contained in the node's alpha set, are those that are adjacent to this node, but that are
                 contained in a different tree.
+            index: An integer that is unique to a node and reflects the order in which nodes are created.
+                It is used to choose pivots deterministically (see 'divide_md_tree()').
     """
 
+    __slots__ = ('id', 'adjacent', 'alpha', 'active_alpha', 'container', 'index')
+
     def __init__(self, node_id):
         """Initialises a 'Node' object.
 
@@ -58,6 +69,7 @@ class Node:
         self.alpha = set()  # the active list of a node
         self.active_alpha = set()  # a subset of the active list of a node containing only the neighbors within a tree partition
         self.container = None
+        self.index = next(_node_indices)
 
     def __str__(self):
         """The string method of a 'Node' object.
@@ -117,7 +129,7 @@ class Graph:
             node: The node that is added to the graph.
         """
 
-        if node.id not in self.nodes.keys():
+        if node.id not in self.nodes:
             self.nodes[node.id] = node
 
     def add_edge(self, u_id, v_id):
@@ -131,31 +143,72 @@ class Graph:
             v_id: The string representing the id of the second node.
         """
 
-        if u_id not in self.nodes.keys():
-            self.add_node(Node(u_id))
-        if v_id not in self.nodes.keys():
-            self.add_node(Node(v_id))
+        # Look up each node only once
+        u = self.nodes.get(u_id)
+        if u is None:
+            u = self.nodes[u_id] = Node(u_id)
+        v = self.nodes.get(v_id)
+        if v is None:
+            v = self.nodes[v_id] = Node(v_id)
+
+        u.adjacent.add(v)
+        v.adjacent.add(u)
+
+    @classmethod
+    def from_edge_list(cls, node_ids, edges):
+        """A method that builds a graph in bulk from its node ids and its edges.
 
-        self.nodes[u_id].add_neighbor(self.nodes[v_id])
-        self.nodes[v_id].add_neighbor(self.nodes[u_id])
+        The nodes are connected directly, instead of looking up both nodes of every edge in the graph's dictionary.
+
+        Args:
+            node_ids: A list of the strings representing the ids of the nodes.
+            edges: An iterable of pairs (i, j) of indices into 'node_ids', each representing an edge.
+
+        Returns:
+            The graph.
+        """
+
+        graph = cls()
+        nodes = [Node(node_id) for node_id in node_ids]
+        graph.nodes = {node.id: node for node in nodes}
+        for i, j in edges:
+            nodes[i].adjacent.add(nodes[j])
+            nodes[j].adjacent.add(nodes[i])
+        return graph
 
     def get_nodes(self):
-        """A method that returns the set of nodes of the graph."""
-        return set(self.nodes.values())
+        """A method that returns a view of the nodes of the graph (no copy is made)."""
+        return self.nodes.values()
+
+    def clone(self):
+        """A method that returns a copy of the graph, which consists of new 'Node' objects with the same ids and edges.
+
+        Returns:
+            The copy of the graph.
+        """
+
+        clone = Graph()
+        for node_id in self.nodes:
+            clone.nodes[node_id] = Node(node_id)
+        for node_id, node in self.nodes.items():
+            clone.nodes[node_id].adjacent = {clone.nodes[neighbor.id] for neighbor in node.adjacent}
+        return clone
 
     def remove_node(self, node_id):
-        """A method that removes a node from the graph.
+        """A method that removes a node from the graph. Nothing happens, if the node is not part of the graph.
 
         Args:
                 node_id: The string representing the id of the node that is removed from the graph.
         """
 
-        for id, node in self.nodes.items():
-            if id != node_id:
-                for neighbor in list(node.adjacent):
-                    if neighbor.id == node_id:
-                        node.adjacent.remove(neighbor)
-        del self.nodes[node_id]
+        node = self.nodes.pop(node_id, None)
+        if node is None:
+            return
+
+        # Only the neighbors of the node refer to it
+        for neighbor in node.adjacent:
+            neighbor.adjacent.discard(node)
+        node.adjacent.clear()
 
 
 class Tree:
@@ -184,16 +237,19 @@ class Tree:
             The label can take on the values DEAD or ZOMBIE. Both indicate, that a tree_node is going to be split up.
             When no splitting occurs, the default value is 'None' is used. (See 'tree_refinement()' and 'factorize()'
             for details.)
-        connectivity: A tuple consisting of a (co-)component-index and a (co-)component-type required to identify the
-            pivot factorizing permutation. (See 'conquer_md_tree()' and 'label_by_component()' for details.)
+        comp_index: The (co-)component-index, required to identify the pivot factorizing permutation.
+            (See 'conquer_md_tree()' and 'label_by_component()' for details.)
         mu: A positive integer value used during the construction phase of the algorithm.
             (See 'build_spine()' and 'conquer_md_tree(') for details.)
         rho: A positive integer value used during the construction phase of the algorithm.
             (See 'build_spine()' and 'conquer_md_tree()' for details.)
         mark_count: A positive integer value used during 'tree_refinement()'.
-        tree_index: A positive integer value used during 'tree_refinement()'.
+        tree_index: A positive integer value used during 'tree_refinement()' and 'factorize()'.
     """
 
+    __slots__ = ('node', 'type', 'parent', 'children', 'is_marked', 'label', 'comp_index', 'mu', 'rho', 'mark_count',
+                 'tree_index')
+
     def __init__(self, node_type, node=None):
         """Initialises a tree node.
 
@@ -214,7 +270,7 @@ class Tree:
         # Additional attributes required by the algorithm
         self.is_marked = False
         self.label = None
-        self.connectivity = (None, None)  # (component_index, component_type)
+        self.comp_index = None
         self.mu = None
         self.rho = None
         self.mark_count = 0
@@ -227,9 +283,13 @@ class Tree:
             The next tree node.
         """
 
-        yield self
-        for child in self.children:
-            yield from child
+        # An explicit stack instead of recursive generators, so that yielding a node does not pass through one
+        # generator frame per level of the tree. The children of a node are read once the node has been yielded.
+        stack = [self]
+        while stack:
+            t_node = stack.pop()
+            yield t_node
+            stack.extend(reversed(t_node.children))
 
     def ancestors(self):
         """A generator that yields all ancestors of 'self' in a bottom up manner.
@@ -238,9 +298,10 @@ class Tree:
             The next tree node, which is the parent to the last yielded node.
         """
 
-        if self.parent is not None:
-            yield self.parent
-            yield from self.parent.ancestors()
+        t_node = self.parent
+        while t_node is not None:
+            yield t_node
+            t_node = t_node.parent
 
     def leaves(self):
         """A generator that yields all leaves of the tree rooted in 'self' starting at the left, going to the right.
@@ -262,11 +323,11 @@ class Tree:
         the root is 'SERIES', then the (co-)components are defined by the leaf-sets of the nodes at depth-1.
         In all other cases the leaves of the root define one (co-)component.
 
-        The label that each node gets assigned is a tuple consisting of the number of the (co-)component and the type.
+        Each leaf gets assigned the number of its (co-)component ('comp_index').
 
         Args:
             connectivity: Takes on the values 'COMPONENT' or 'CO_COMPONENT'.
-                It indicates whether to identify components or co-components and is also used for labelling the nodes.
+                It indicates whether to identify components or co-components.
             number_of_components: The number of (co-)components found in earlier calls of this function. It is used to
                 label the nodes.
 
@@ -279,13 +340,13 @@ class Tree:
             # Multiple (co-)components defined by children of root
             for child in self.children:
                 for leaf in child.leaves():
-                    leaf.connectivity = (number_of_components, connectivity)
+                    leaf.comp_index = number_of_components
                 number_of_components += 1  # Respectively number of co-components
             return number_of_components
 
         # Only one (co-)component defined by root
         for leaf in self.leaves():
-            leaf.connectivity = (number_of_components, connectivity)
+            leaf.comp_index = number_of_components
         return number_of_components + 1
 
     def nodes_by_label(self, label):
@@ -316,7 +377,10 @@ class Tree:
 
         for child in children:
             new_node.insert(child)
-            self.children.remove(child)
+
+        # Filter the children in a single pass instead of removing them one by one
+        moved = set(children)
+        self.children = [child for child in self.children if child not in moved]
         self.insert(new_node)
         return new_node
 
@@ -355,6 +419,29 @@ class Tree:
                 miss_group.append(child)
         return hit_group, miss_group
 
+    def order_children(self, group_fn, hits_first=True):
+        """A method, that orders the children of a node so that those in one group appear before those in the other.
+
+        The children keep their relative order within each group and are reordered with a single new list.
+
+        Args:
+            group_fn: A function, that is called on a node. It returns a boolean.
+            hits_first: A boolean. If true the children for which 'group_fn' returned 'True' appear first,
+                otherwise they appear last.
+        Returns:
+            The number of children for which 'group_fn' returned 'True'.
+        """
+
+        hit_group, miss_group = self.group_children(group_fn)
+        number_hits = len(hit_group)
+        if hits_first:
+            hit_group.extend(miss_group)
+            self.children = hit_group
+        else:
+            miss_group.extend(hit_group)
+            self.children = miss_group
+        return number_hits
+
     def insert(self, child):
         """A method that inserts a node as a child to 'self'.
 
@@ -383,9 +470,10 @@ class Tree:
             The root of the tree that 'self' is contained in:
         """
 
-        if self.parent is not None:
-            return self.parent.get_root()
-        return self
+        t_node = self
+        while t_node.parent is not None:
+            t_node = t_node.parent
+        return t_node
 
 
 class PartitionClass:
@@ -393,10 +481,10 @@ class PartitionClass:
 
     Attributes:
         nodes: A set, that holds the nodes that belong to the partition class.
-        previous: The class that is before the partition class. The default value is 'None'.
-        next: The class that is after the partition class. The default value is 'None'.
     """
 
+    __slots__ = ('nodes',)
+
     def __init__(self, nodes):
         """Initialises a partition class.
 
@@ -405,8 +493,6 @@ class PartitionClass:
         """
 
         self.nodes = nodes
-        self.previous = None
-        self.next = None
 
         # TODO: Required by 'partition_refinement()'. See 'divide_md_tree()'.
         # for n in nodes:
@@ -418,24 +504,23 @@ class Partition:
     """A class used to represent a ordered partition.
 
     Attributes:
-        head: The first class in the ordered partition.
+        classes: A 'deque' holding the classes of the partition in order.
     """
 
+    __slots__ = ('classes',)
+
     def __init__(self):
         """Initialises a partition."""
-        self.head = None
+        self.classes = deque()
 
     def __iter__(self):
-        """A generator, that yields the classes which form the partition.
+        """Returns an iterator over the classes which form the partition.
 
-        Yields:
-            The next class in the partition.
+        Returns:
+            An iterator over the classes in the partition.
         """
 
-        current_p_class = self.head
-        while current_p_class is not None:
-            yield current_p_class
-            current_p_class = current_p_class.next
+        return iter(self.classes)
 
     def prepend(self, p_class):
         """A method, that prepends a class to a partition.
@@ -444,19 +529,16 @@ class Partition:
             p_class: The partition class which is prepended to the partition.
         """
 
-        if self.head is not None:
-            p_class.next = self.head
-            self.head.previous = p_class
-        self.head = p_class
+        self.classes.appendleft(p_class)
 
     def get_first(self):
         """A method, that returns the first partition class in the partition.
 
         Returns:
-            The first partition class in the partition.
+            The first partition class in the partition. If the partition is empty, 'None' is returned.
         """
 
-        return self.head
+        return self.classes[0] if self.classes else None
 
     def pop_first(self):
         """A method, that removes the first partition class from the partition and returns it.
@@ -465,39 +547,26 @@ class Partition:
             The first partition class in the partition. If the partition is empty, 'None' is returned.
         """
 
-        if self.head is None:
-            return None
-
-        old_head = self.head
-        if self.head.next is not None:
-            self.head.next.previous = None
-            self.head = self.head.next
-            old_head.next = None
-            return old_head
-
-        self.head = None
-        return old_head
+        return self.classes.popleft() if self.classes else None
 
     def replace(self, old_p_class, p_class_a, p_class_b):
         """A method that replaces a partition class with two other partition classes.
 
         'p_class_a' goes before 'p_class_b'. Together (under union) they represent a refinement of the old class.
 
+        Note:
+            The class is looked up by a linear scan. To refine many classes at once, build a new 'deque' of
+            classes instead (see 'divide_md_tree()').
+
         Args:
             old_p_class: A class which is going to be replaced with two classes.
             p_class_a: One of two classes, that replace the old class. This class goes directly before 'p_class_b'.
             p_class_b: The other class replacing the old class. It directly follows 'p_class_a'.
         """
-        p_class_a.next = p_class_b
-        p_class_b.previous = p_class_a
-        if old_p_class.previous is None:
-            self.head = p_class_a
-        else:
-            old_p_class.previous.next = p_class_a
-            p_class_a.previous = old_p_class.previous
-        if old_p_class.next is not None:
-            old_p_class.next.previous = p_class_b
-            p_class_b.next = old_p_class.next
+
+        i = self.classes.index(old_p_class)
+        self.classes[i] = p_class_b
+        self.classes.insert(i, p_class_a)
 
     def flatten(self):
         """A method, that returns a set containing all nodes, contained within the partition.
@@ -515,7 +584,7 @@ class Partition:
             'True' if the partition is empty, 'False' if the partition is not empty.
         """
 
-        return self.head is None
+        return not self.classes
 
 
 def partition_refinement(partition, pivot_set):
@@ -569,6 +638,10 @@ def partition_refinement(partition, pivot_set):
         c.has_split = False
 
 
+# The key by which pivots are chosen
+_by_index = attrgetter('index')
+
+
 def md_tree(graph):
     """A function, that calculates the modular decomposition tree of a graph.
 
@@ -579,7 +652,7 @@ def md_tree(graph):
         tree: The modular decomposition tree.
     """
 
-    (tree, partition) = divide_md_tree(graph.get_nodes(), Partition())
+    (tree, partition) = divide_md_tree(set(graph.get_nodes()), Partition())
 
     return tree
 
@@ -591,6 +664,7 @@ def divide_md_tree(s, p):
     sub-problems, respectively computing the modular decomposition trees for sub-graphs. When these sub-problems are
     solved, their solutions are combined to build the modular decomposition tree for the complete graph.
     The solutions to the sub-problems on their part, are obtained in the same recursive manner.
+    (The recursion is carried out with an explicit stack instead of recursive function calls.)
 
     Formally, the function computes an ordered maximal slice partition of a graph G with respect to an lexicographic
     breadth first search starting from some pivot node x. These maximal slices represent the sub-problems,
@@ -622,63 +696,91 @@ def divide_md_tree(s, p):
            that is universal to Pi' and isolated from Pj'.
     """
 
-    # Choose some pivot x ∈ S
-    x = next(iter(s))
-
-    # Add x to α(y), for each y ∈ N(x) ∩ (S ∪ S')
-    s_ = p.flatten()  # S'
-    for y in x.adjacent & (s | s_):
-        y.add_alpha_neighbor(x)
-
-    # # Refine each partition class according to the neighborhood of x
-    for p_class in p:
-
-        # A ← P ∩ N(x)
-        a = p_class.nodes & x.adjacent
-
-        # B ← P − A
-        b = p_class.nodes - a
-
-        # If A, B ≠ ∅ then replace P in P with A, B in this order
-        if len(a) != 0 and len(b) != 0:
-            p.replace(p_class, PartitionClass(a), PartitionClass(b))
+    # The recursion is unrolled: for every set S, whose sub-problems are being solved, the stack holds the pair
+    # (S, trees) with the trees computed for S so far. Each pass of the loop processes a new set S.
+    stack = []
+    while True:
+        # Choose some pivot x ∈ S; the node created first is chosen, so the result does not depend on the
+        # iteration order of the set
+        x = min(s, key=_by_index)
+
+        # N(x) ∩ S and S − N[x]; both are used several times below
+        x_adj = x.adjacent
+        nbrs_in_s = x_adj & s
+        rest = s - nbrs_in_s
+        rest.discard(x)
+
+        # Add x to α(y), for each y ∈ N(x) ∩ (S ∪ S') (without a method call per neighbor)
+        # S' is not materialized: N(x) ∩ S' is covered class by class by the sets A computed below, so every
+        # intersection only takes time proportional to the smaller of the two sets
+        for y in nbrs_in_s:
+            y.alpha.add(x)
+
+        # # Refine each partition class according to the neighborhood of x
+        # The refined partition is collected in a new 'deque', instead of splicing classes into the one being iterated
+        refined_classes = deque()
+        for p_class in p:
+
+            # A ← P ∩ N(x)
+            p_nodes = p_class.nodes
+            a = p_nodes & x_adj
+            for y in a:
+                y.alpha.add(x)
+
+            # If A, B ≠ ∅ then replace P in P with A, B in this order
+            # B ← P − A is only non-empty (and only computed) if A is a proper subset of P
+            if a and len(a) != len(p_nodes):
+                refined_classes.append(PartitionClass(a))
+                refined_classes.append(PartitionClass(p_nodes - a))
+            else:
+                refined_classes.append(p_class)
+        p.classes = refined_classes
 
-    # # TODO: Use this for proper partition refinement instead (practically slower). See 'PartitionClass'.
-    # if not p.is_empty():
-    #     partition_refinement(p, x.adjacent & s_)
+        # # TODO: Use this for proper partition refinement instead (practically slower). See 'PartitionClass'.
+        # if not p.is_empty():
+        #     partition_refinement(p, x.adjacent & s_)
 
-    # If S = {x} then return (x, P)
-    if len(s) == 1 and x in s:
+        # Initialise the ordered list of trees with {x}
         tree_x = Tree(Type.NODE, x)
         x.container = tree_x
-        return tree_x, p
 
-    # If S − (N[x] ∩ S) ≠ ∅ then prepend S −(N[x] ∩ S) to P
-    if not len(s - (x.closed_neighborhood() & s)) == 0:
-        p.prepend(PartitionClass(s - (x.closed_neighborhood() & s)))
+        # If S = {x} then return (x, P)
+        if len(s) == 1:
+            tree = tree_x
+
+        else:
+            # If S − (N[x] ∩ S) ≠ ∅ then prepend S −(N[x] ∩ S) to P
+            if rest:
+                p.prepend(PartitionClass(rest))
+
+            # If N(x) ≠ ∅ then prepend N(x) ∩ S to P
+            if nbrs_in_s:
+                p.prepend(PartitionClass(nbrs_in_s))
 
-    # If N(x) ≠ ∅ then prepend N(x) ∩ S to P
-    if not len(x.adjacent & s) == 0:
-        p.prepend(PartitionClass(x.adjacent & s))
+            stack.append((s, [tree_x]))
+            tree = None
 
-    # Initialise the ordered list of trees with {x}
-    tree_x = Tree(Type.NODE, x)
-    x.container = tree_x
-    trees = [tree_x]
+        # Return the computed trees to the sets they belong to, until a set with an unsolved sub-problem is found
+        while True:
+            if tree is not None:
+                if not stack:
+                    return tree, p
 
-    # While P ⊆ S, where P is the first class in Partition
-    while not (p.is_empty()) and p.get_first().nodes <= s:
-        # Remove P from the Partition
-        # (T,P) ← DivideMDTree(P,Partition)
-        tree, p = divide_md_tree(p.pop_first().nodes, p)
+                # Append T to the list of trees
+                stack[-1][1].append(tree)
 
-        # Append T to the list of trees
-        trees.append(tree)
+            s, trees = stack[-1]
 
-    # Build the modular decomposition from the trees in the tree partition
-    trees = conquer_md_tree(trees)
+            # While P ⊆ S, where P is the first class in Partition
+            if not p.is_empty() and p.get_first().nodes <= s:
+                # Remove P from the Partition
+                # (T,P) ← DivideMDTree(P,Partition)
+                s = p.pop_first().nodes
+                break
 
-    return trees, p
+            # Build the modular decomposition from the trees in the tree partition
+            stack.pop()
+            tree = conquer_md_tree(trees)
 
 
 def tree_refinement(trees):
@@ -697,7 +799,7 @@ def tree_refinement(trees):
     is rearranged, depending on the index of the tree in which they reside.
 
     Note:
-        The function does not return anything. Instead the objects corresponding to the trees are directly modified.
+        The objects corresponding to the trees are directly modified.
 
     Args:
         trees: A 'list' of 'Tree' objects, representing a  maximal slice tree partition T = T0, ..., Tk of some graph G,
@@ -705,6 +807,9 @@ def tree_refinement(trees):
             Moreover, each leaf x ∈ Li has an associated set α(x) consisting of its neighbours amongst
             the leaves of the Tj’s, j < i. (Neighbors amongst other maximal slice partitions are also contained in the
             set α(x), but their evaluation is of no interest here.)
+
+    Returns:
+        A 'list' of the nodes that have been labelled 'DEAD' (see 'factorize()').
     """
 
     # Identify all leaves in T
@@ -715,88 +820,98 @@ def tree_refinement(trees):
         for u in tree:
             u.tree_index = i
 
+    # Sets to keep track of marked leaves, marked inner nodes and unmarked nodes with a marked child.
+    # They are emptied after every leaf y instead of being allocated anew.
+    marked_leaves = set()
+    marked_nodes = set()
+    unmarked_nodes_with_a_marked_child = set()  # Nodes to refine
+    dead_nodes = []  # The nodes labelled 'DEAD', in the order in which they are labelled
+
     for tree in trees:
         for y in tree.leaves():
 
             # Compute the active alpha list α'(y) (active edges only involving nodes in T)
-            # and update the alpha list α(y)
-            y.node.active_alpha = y.node.alpha & all_leaves
-            y.node.alpha = y.node.alpha - y.node.active_alpha
-
-            # Sets to keep track of marked leaves, marked inner nodes and unmarked nodes with a marked child
-            marked_leaves = set()
-            marked_nodes = set()
-            unmarked_nodes_with_a_marked_child = set()  # Nodes to refine
+            # and update the alpha list α(y) in place
+            y_node = y.node
+            y_node.active_alpha = y_node.alpha & all_leaves
+            y_node.alpha -= y_node.active_alpha
 
             # Traverse the active alpha list α'(y) and mark each leaf
-            for node in y.node.active_alpha:
-                node.container.is_marked = True
-                marked_leaves.add(node.container)
+            for node in y_node.active_alpha:
+                leaf = node.container
+                leaf.is_marked = True
+                marked_leaves.add(leaf)
 
                 # Increase the mark count of the parent of the marked leaf
-                if node.container.parent is not None:
-                    node.container.parent.mark_count += 1
-                    unmarked_nodes_with_a_marked_child.add(node.container.parent)
+                if leaf.parent is not None:
+                    leaf.parent.mark_count += 1
+                    unmarked_nodes_with_a_marked_child.add(leaf.parent)
 
-            # For each marked leaf: Mark their ancestors, if they are parent to only marked children
+            # For each marked leaf: Mark their ancestors, if they are parent to only marked children.
+            # A climb stops at an ancestor that is already marked, as the ancestors above it have already been visited.
             for t_node in marked_leaves:
                 parent = t_node.parent
-                while parent is not None:
-                    if parent.mark_count == len(parent.children):
-                        if parent.parent is not None and not parent.is_marked:
-                            parent.parent.mark_count += 1
-                            if not parent.parent.is_marked:
-                                unmarked_nodes_with_a_marked_child.add(parent.parent)
+                while parent is not None and not parent.is_marked:
+                    if parent.mark_count != len(parent.children):
+                        # The node the climb came from is a marked child of the parent
+                        unmarked_nodes_with_a_marked_child.add(parent)
+                        break
 
-                        parent.is_marked = True
-                        marked_nodes.add(parent)
-                        unmarked_nodes_with_a_marked_child.discard(parent)
+                    grandparent = parent.parent
+                    if grandparent is not None:
+                        grandparent.mark_count += 1
+                        unmarked_nodes_with_a_marked_child.add(grandparent)
 
-                        parent = parent.parent
+                    parent.is_marked = True
+                    marked_nodes.add(parent)
+                    unmarked_nodes_with_a_marked_child.discard(parent)
 
-                    else:
-                        if any(c.is_marked for c in parent.children):
-                            unmarked_nodes_with_a_marked_child.add(parent)
-                        break
+                    parent = grandparent
 
             for u in unmarked_nodes_with_a_marked_child:
-                # Let A be the set of marked children of u, and let B be its other children
-                a, b = u.group_children(lambda x: x.is_marked)
-
-                # If |A| > 1 and u is degenerate
-                if len(a) > 1 and u.is_degenerate():
-                    # Replace the children in A with a new marked node inheriting u’s type,
-                    # whose children are those nodes in A
-                    u.replace_children(a).is_marked = True
-
-                # If |B| > 1 and u is degenerate
-                if len(b) > 1 and u.is_degenerate():
-                    # Replace the children in B with a new unmarked node inheriting u’s type,
-                    # whose children are those nodes in B
-                    u.replace_children(b).is_marked = False
+                # Both replacements require u to be degenerate, which they do not change.
+                # So u is checked once, and its children are only grouped if it is degenerate.
+                if u.is_degenerate():
+                    # Let A be the set of marked children of u, and let B be its other children
+                    a, b = u.group_children(lambda x: x.is_marked)
+
+                    # If |A| > 1 and u is degenerate
+                    if len(a) > 1:
+                        # Replace the children in A with a new marked node inheriting u’s type,
+                        # whose children are those nodes in A.
+                        # The new node is recorded with the marked nodes, so that its mark is cleared below as well
+                        # (a stale mark would stop the marking climb of a later leaf at this node).
+                        new_a = u.replace_children(a)
+                        new_a.is_marked = True
+                        marked_nodes.add(new_a)
+
+                    # If |B| > 1 and u is degenerate
+                    if len(b) > 1:
+                        # Replace the children in B with a new unmarked node inheriting u’s type,
+                        # whose children are those nodes in B
+                        u.replace_children(b).is_marked = False
 
                 # Label u as 'DEAD', if u is not labelled 'DEAD'
                 if u.label is not Label.DEAD:
                     u.label = Label.DEAD
+                    dead_nodes.append(u)
 
-                    # Group u's children in marked and unmarked children
-                    marked, unmarked = u.group_children(lambda x: x.is_marked)
-
-                    if u.tree_index == 1:
-                        # Make u’s marked child its left child and u’s unmarked child its right child
-                        u.children = [*marked, *unmarked]
-
-                    else:
-                        # Make u’s marked child its right child and make u’s unmarked child its left child
-                        u.children = [*unmarked, *marked]
+                    # If i = 1 make u’s marked child its left child and u’s unmarked child its right child,
+                    # else make u’s marked child its right child and make u’s unmarked child its left child
+                    u.order_children(lambda x: x.is_marked, hits_first=u.tree_index == 1)
 
             # Finally clear the marks of the nodes and set back their mark counters
-            for t_node in marked_leaves | marked_nodes | unmarked_nodes_with_a_marked_child:
+            for t_node in chain(marked_leaves, marked_nodes, unmarked_nodes_with_a_marked_child):
                 t_node.is_marked = False
                 t_node.mark_count = 0
+            marked_leaves.clear()
+            marked_nodes.clear()
+            unmarked_nodes_with_a_marked_child.clear()
+
+    return dead_nodes
 
 
-def factorize(trees):
+def factorize(trees, dead_nodes=None):
     """A function, that modifies a maximal slice tree partition T = T0, ..., Tk of some graph G, as produced by
     'tree_refinement()', where T0 = x is the pivot, and L0, ..., Lk are the corresponding leaf sets,
     in such a way, that - except for the position of the pivot - a factorizing permutation is obtained.
@@ -822,49 +937,63 @@ def factorize(trees):
         trees: A 'list' of 'Tree' objects, representing a maximal slice tree partition T = T0, ..., Tk of some graph G,
             as produced by 'tree_refinement()', where T0 = x is the pivot, and L0, ..., Lk are the corresponding leaf
             sets.
+        dead_nodes: An optional 'list' of the nodes in T that are labelled 'DEAD', as returned by 'tree_refinement()'.
+            If it is not given, the nodes are collected by traversing T.
     """
 
-    # For each Ti ∈ T
-    for i, tree_i in enumerate(trees):
-
-        # For each node u ∈ Ti labelled 'DEAD'
-        for u in tree_i.nodes_by_label(Label.DEAD):
-
-            # Label all of u's ancestors as 'ZOMBIE' unless they are labelled 'DEAD'
-            for t_node in u.ancestors():
-                if t_node.label is Label.ZOMBIE:  # All ancestors are already labelled 'ZOMBIE' (or remain 'DEAD')
-                    break
-                if t_node.label is not Label.DEAD:
-                    t_node.label = Label.ZOMBIE
-
-        # For each node u ∈ Ti labelled 'ZOMBIE'
-        for u in tree_i.nodes_by_label(Label.ZOMBIE):
-
-            # Let A be the children of u that are labelled 'DEAD' or 'ZOMBIE', and let B be its other children
-            a, b = u.group_children(lambda x: x.label is Label.DEAD or x.label is Label.ZOMBIE)
-
-            if len(b) > 1 and u.is_degenerate():
-                # Replace the children in B with a new marked node inheriting u's type,
-                # whose children are those nodes in B
-                u.replace_children(b)
-
-            # Let A be the children of u that are labelled 'DEAD' or 'ZOMBIE', and let B be its other children
-            a, b = u.group_children(lambda x: x.label is Label.DEAD or x.label is Label.ZOMBIE)
-
-            # If i = 1 then order the children of u so that those in A appear first
-            if i == 1:
-                u.children = [*a, *b]
-
-            # Else order the children of u so that those in A appear last
-            else:
-                u.children = [*b, *a]
+    # Labels are only ever 'DEAD', 'ZOMBIE' or 'None', so a node is labelled 'DEAD' or 'ZOMBIE' if it has any label
+    DEAD, ZOMBIE = Label.DEAD, Label.ZOMBIE
+
+    def is_dead_or_zombie(t_node):
+        """A function that checks, whether a node is labelled 'DEAD' or 'ZOMBIE'."""
+        return t_node.label is not None
+
+    # The nodes labelled 'DEAD' are either handed over by 'tree_refinement()' or collected from T.
+    # All other labelled nodes are collected while they are labelled, so that no Ti is traversed again.
+    if dead_nodes is None:
+        dead_nodes = [u for tree_i in trees for u in tree_i.nodes_by_label(DEAD)]
+    zombie_nodes = []
+
+    # For each Ti ∈ T and each node u ∈ Ti labelled 'DEAD'
+    for u in dead_nodes:
+
+        # Label all of u's ancestors as 'ZOMBIE' unless they are labelled 'DEAD'.
+        # The walk stops at the first labelled ancestor: if it is labelled 'ZOMBIE', its ancestors have been
+        # labelled by an earlier walk, and if it is labelled 'DEAD', its ancestors are labelled by its own walk.
+        t_node = u.parent
+        while t_node is not None and t_node.label is None:
+            t_node.label = ZOMBIE
+            zombie_nodes.append(t_node)
+            t_node = t_node.parent
+
+    # For each Ti ∈ T and each node u ∈ Ti labelled 'ZOMBIE'
+    for u in zombie_nodes:
+
+        # Let A be the children of u that are labelled 'DEAD' or 'ZOMBIE', and let B be its other children
+        a, b = u.group_children(is_dead_or_zombie)
+
+        if len(b) > 1 and u.is_degenerate():
+            # Replace the children in B with a new marked node inheriting u's type,
+            # whose children are those nodes in B.
+            # The new node is unlabelled, so it is now the only child in B, while A is unchanged.
+            b = [u.replace_children(b)]
+
+        # If i = 1 then order the children of u so that those in A appear first
+        # (A and B are fresh lists, so one of them is extended instead of copying both into a new list)
+        if u.tree_index == 1:
+            a.extend(b)
+            u.children = a
+
+        # Else order the children of u so that those in A appear last
+        else:
+            b.extend(a)
+            u.children = b
 
-        # Clear all labels and set the parent of the children of 'DEAD' or 'ZOMBIE' nodes to 'None'
-        for t_node in tree_i:
-            if t_node.label is Label.DEAD or t_node.label is Label.ZOMBIE:
-                t_node.label = None
-                for child in t_node.children:
-                    child.parent = None
+    # Clear all labels and set the parent of the children of 'DEAD' or 'ZOMBIE' nodes to 'None'
+    for t_node in chain(dead_nodes, zombie_nodes):
+        t_node.label = None
+        for child in t_node.children:
+            child.parent = None
 
 
 def build_spine(sigma):
@@ -909,9 +1038,17 @@ def build_spine(sigma):
 
     # T ← x
     tree = sigma.pivot
+    co_components, components = sigma.co_components, sigma.components
 
     # Determine the number of (co-)component
-    a, b = len(sigma.co_components), len(sigma.components)
+    a, b = len(co_components), len(components)
+
+    # The (co-)components and their μ- and ρ-values as plain lists, so that ranges of them are taken as slices
+    co_component_sets = [cc.co_component for cc in co_components]
+    component_sets = [c.component for c in components]
+    co_component_mu = [cc.mu for cc in co_components]
+    component_mu = [c.mu for c in components]
+    component_rho = [c.rho for c in components]
 
     # Initialise the left / right indices.
     l, r = 0, 0
@@ -923,49 +1060,54 @@ def build_spine(sigma):
         contains_co_component, contains_component = False, False
 
         # M ← ∅; The strong module containing x that will be identified this iteration
+        # The (co-)components are added in bulk, once the range they are taken from is known.
         module = []
 
         # # Locating 'SERIES' modules # #
 
         # Increment the left index to check the first co-component in this iteration
         l += 1
+        first = l
 
         # While l ≤ a and μ(C'l) = r
-        while l <= a and sigma.co_components[l - 1].mu == r:
-            # M ← M ∪ {C'l}
-            module.append(sigma.co_components[l - 1].co_component)
-            contains_co_component = True
-
+        while l <= a and co_component_mu[l - 1] == r:
             # Increment the left index to check the next co-component
             l += 1
 
         # Decrement the left index, as the last checked co-component was not "legal"
         l -= 1
 
+        # M ← M ∪ {C'i | i ∈ [first, l]}
+        if l >= first:
+            module.extend(co_component_sets[first - 1:l])
+            contains_co_component = True
+
         # # Locating 'PARALLEL' modules # #
 
         # If M = ∅
-        if len(module) == 0:
+        if not contains_co_component:
 
             # Increment the right index to check the first component in this iteration
             r += 1
+            first = r
 
             # While r ≤ b and μ(Cr) = l and ρ(Cr) = 0
-            while r <= b and sigma.components[r - 1].mu == l and sigma.components[r - 1].rho == 0:
-                # M ← M ∪ {Cr}
-                module.append(sigma.components[r - 1].component)
-                contains_component = True
-
-                # Increment the left index to check the next co-component
+            while r <= b and component_mu[r - 1] == l and component_rho[r - 1] == 0:
+                # Increment the right index to check the next component
                 r += 1
 
             # Decrement the right index, as the last checked component was not "legal"
             r -= 1
 
+            # M ← M ∪ {Ci | i ∈ [first, r]}
+            if r >= first:
+                module.extend(component_sets[first - 1:r])
+                contains_component = True
+
         # # Locating PRIME modules # #
 
         # If M = ∅
-        if len(module) == 0:
+        if not (contains_co_component or contains_component):
 
             # Increment the left and right index to check the first co-component and the first component in this
             # iteration
@@ -977,10 +1119,10 @@ def build_spine(sigma):
             l_, r_ = l, r
 
             # t ← max{μ(Cr), l}
-            t = max(sigma.components[r - 1].mu, l)
+            t = max(component_mu[r - 1], l)
 
             # m ← max{μ(C'l), ρ(Cr), r}
-            m = max(sigma.co_components[l - 1].mu, sigma.components[r - 1].rho, r)
+            m = max(co_component_mu[l - 1], component_rho[r - 1], r)
 
             # while t != l_ and m != r_:
             while True:
@@ -989,11 +1131,10 @@ def build_spine(sigma):
                 t_, m_ = t, m
 
                 # t ← max{max{μ(Ci) | i ∈ [r', m]}, t}
-                t = max(max(sigma.components[i - 1].mu for i in range(r_, m + 1)), t)
+                t = max(max(component_mu[r_ - 1:m]), t)
 
                 # m ← max{max{μ(C'i) | i ∈ [l', t]}, max{ρ(Ci | i ∈ [r', m]}, m}
-                m = max(max(sigma.co_components[i - 1].mu for i in range(l_, t + 1)),
-                        max(sigma.components[i - 1].rho for i in range(r_, m + 1)), m)
+                m = max(max(co_component_mu[l_ - 1:t]), max(component_rho[r_ - 1:m]), m)
 
                 # Update l', r'
                 # l' ← t'; r' ← m'
@@ -1003,15 +1144,13 @@ def build_spine(sigma):
                 if t_ == t and m_ == m:
                     break
 
-            # M ← M ∪ {C'i | i ∈ [l, t]}
-            for i in range(l, t + 1):
-                module.append(sigma.co_components[i - 1].co_component)
-                contains_co_component = True
+            # M ← M ∪ {C'i | i ∈ [l, t]}; t ≥ l, so the range is not empty
+            module.extend(co_component_sets[l - 1:t])
+            contains_co_component = True
 
-            # M ← M ∪ {Ci | i ∈ [r, m]}
-            for i in range(r, m + 1):
-                module.append(sigma.components[i - 1].component)
-                contains_component = True
+            # M ← M ∪ {Ci | i ∈ [r, m]}; m ≥ r, so the range is not empty
+            module.extend(component_sets[r - 1:m])
+            contains_component = True
 
             # Update l, r
             # l ← t; r ← m
@@ -1086,37 +1225,21 @@ def pivot_factorizing_permutation(trees):
             for t_node in tree.leaves():
                 components.append(t_node)
 
-    # Group the nodes in 'co_components' / 'components' by their 'connectivity' label
-    co_components = [frozenset(cc) for key, cc in groupby(co_components, key=lambda x: x.connectivity)]
+    # Group the nodes in 'co_components' / 'components' by their (co-)component-index.
+    # All nodes in 'co_components' are labelled as co-components and all nodes in 'components' as components,
+    # so the index alone identifies the group.
+    co_components = [frozenset(cc) for key, cc in groupby(co_components, key=attrgetter('comp_index'))]
     co_components.reverse()  # Reverse 'co_components' as it is descendingly indexed
-    components = [frozenset(c) for key, c in groupby(components, key=lambda x: x.connectivity)]
-
-    def is_adjacent_to_component(quantifier_fn, node, component):
-        """A function that checks whether a node is adjacent to (any/all) nodes in a component.
-
-        Args:
-            quantifier_fn: A quantifier function. Depending on the case, 'any()' or 'all()' is handed in
-                as a function here.
-            node: The node for which to check its adjacency to the nodes in the component.
-            component: The component for which to check its adjacency to the node.
-
-        Returns:
-            'True' if a node is adjacent to (any/all) nodes in the component, 'False' else.
-        """
+    components = [frozenset(c) for key, c in groupby(components, key=attrgetter('comp_index'))]
 
-        def is_adjacent(u, v):
-            """A function that checks whether two nodes are adjacent to each other.
+    # Map the nodes in the components to the index j of their component Cj,
+    # so that the μ- and ρ-values can be read off the neighbors of a node instead of testing every component
+    component_of = {t_node.node: j for j, c in enumerate(components, 1) for t_node in c}
+    component_nodes = set(component_of)
+    component_index = component_of.__getitem__
 
-            Args:
-                u: The first node.
-                v: The second node.
-            Returns:
-                'True' if 'u' is adjacent to 'v' (and vice versa), 'False' else.
-            """
-
-            return u.node in v.node.adjacent
-
-        return quantifier_fn(is_adjacent(node, n) for n in component)
+    # The nodes (not the leaves) of each co-component, so that adjacency to all of them is a single subset test
+    co_component_nodes = [frozenset(t_node.node for t_node in cc) for cc in co_components]
 
     # Compute μ(l) for each l ∈ Li, i ∈ [1, k]
     a, b = len(co_components), len(components)
@@ -1124,43 +1247,34 @@ def pivot_factorizing_permutation(trees):
         if i == 1:
             # For each y ∈ L1, let μ(y) be the smallest j (possibly j = 0)
             # such that every z ∈ Cl, l > j, is non-adjacent to y.
+            # That is the largest j such that y is adjacent to some z ∈ Cj.
             for y in tree.leaves():
-                j = b
-                while j > 0 and not is_adjacent_to_component(any, y, components[j - 1]):
-                    j -= 1
-                y.mu = j
+                y.mu = max(map(component_index, y.node.adjacent & component_nodes), default=0)
         else:
             # For each w ∈ Li, i > 1, let μ(y) be the smallest j (possibly j = 0)
             # such that every z ∈ C'l, l > j, is adjacent to y.
+            # Only the co-components that y is completely adjacent to, and the first one it is not, are tested.
             for y in tree.leaves():
+                y_adjacent = y.node.adjacent
                 j = a
-                while j > 0 and is_adjacent_to_component(all, y, co_components[j - 1]):
+                while j > 0 and co_component_nodes[j - 1] <= y_adjacent:
                     j -= 1
                 y.mu = j
 
     # Compute ρ(l) for each l ∈ Li, i ∈ [2, k]
     # For each y ∈ Ci, 1 ≤ i ≤ b, let ρ(y) be the largest j > i such that
     # there exists a z ∈ Cj to whom y is adjacent; if no such j exists, then ρ(y) = 0.
+    # The largest j, such that y is adjacent to some z ∈ Cj, is read off the neighbors of y
     for i in range(1, b + 1):
         for y in components[i - 1]:
-            y.rho = 0
-            for j in range(b, i, -1):
-                if is_adjacent_to_component(any, y, components[j - 1]):
-                    y.rho = j
-                    break
-
-    # Declare the 'CoComponent' / 'Component' type
-    CoComponent = namedtuple('CoComponent', 'co_component, mu')
-    Component = namedtuple('Component', 'component, mu, rho')
+            j = max(map(component_index, y.node.adjacent & component_nodes), default=0)
+            y.rho = j if j > i else 0
 
     # Calculate μ(C'i), μ(Ci), ρ(Ci) for each (co-)component
     # μ(C') := max{μ(y) | y ∈ C'}; μ(C) := max{μ(y) | y ∈ C}; ρ(C) := max{ρ(y) | y ∈ C}
     co_components = [CoComponent(cc, max(node.mu for node in cc)) for cc in co_components]
     components = [Component(c, max(node.mu for node in c), max(node.rho for node in c)) for c in components]
 
-    # Declare the 'PivotFactorizationPermutation' type
-    PivotFactorizingPermutation = namedtuple('PivotFactorizingPermutation', 'pivot, co_components, components')
-
     return PivotFactorizingPermutation(trees[0], co_components, components)
 
 
@@ -1228,10 +1342,10 @@ def conquer_md_tree(trees):
             b = tree.label_by_component(Connectivity.COMPONENT, b)
 
     # Refine the tree partition T = T0, ..., Tk'
-    tree_refinement(trees_)  # TODO
+    dead_nodes = tree_refinement(trees_)  # TODO
 
     # Factorize the tree partition T = T0, ..., Tk'
-    factorize(trees_)
+    factorize(trees_, dead_nodes)
 
     # Compute the pivot factorizing permutation σ = C'a, ..., C'1, x, C1, ...,Cb defined by T
     sigma = pivot_factorizing_permutation(trees_)
@@ -1240,24 +1354,22 @@ def conquer_md_tree(trees):
     tree = build_spine(sigma)
 
     # Replace the leaves (co-components) of the tree with the corresponding trees in T
+    # Every leaf in 'replaced' is already in the tree, in the form "the corresponding tree". Hence, 'get_root()' and
+    # 'leaves()' are called only once per inserted tree.
     replaced = set()
+    component_leaves = {}  # The (co-)component leaves, grouped by their parent
     for leaf in tree.leaves():
         if type(leaf.node) != Node:  # A (co-)component
-            not_replaced = set(i for i in leaf.node)  # Nodes in the (co-)component that are not yet in the tree
+            component_leaves.setdefault(leaf.parent, set()).add(leaf)
             for t_node in leaf.node:  # Iterating through the component as the frozenset
-                if t_node in replaced:  # Node has been replaced
-                    continue
-                if t_node in not_replaced:  # This node is not already in the tree, in the form "the corresponding tree"
+                if t_node not in replaced:  # This node is not already in the tree
                     root = t_node.get_root()  # Get the root of the tree, that this vertex is a leaf of
                     leaf.parent.insert(root)  # Insert the tree
-                    not_replaced = not_replaced.difference(root.leaves())  # Update 'not_replaced'
-                    for node in root.leaves():  # Update 'replaced'
-                        replaced.add(node)
+                    replaced.update(root.leaves())  # Update 'replaced'
 
-    # Remove the (co-)components
-    for leaf in list(tree.leaves()):
-        if type(leaf.node) != Node:
-            leaf.parent.children.remove(leaf)
+    # Remove the (co-)components, filtering the children of each parent once
+    for parent, leaves in component_leaves.items():
+        parent.children = [child for child in parent.children if child not in leaves]
 
     # Update the tree, depending on whether G is disconnected (k' = k - 1)
     if k_ == k - 1:
@@ -1274,12 +1386,24 @@ def conquer_md_tree(trees):
             new_node.insert(trees[k])
             tree = new_node
 
-    # For each degenerate node u in the tree whose parent has the same type, replace u by its children
-    for t_node in tree:
-        if t_node.parent is not None and t_node.type == t_node.parent.type and t_node.is_degenerate():
-            for child in t_node.children:
-                t_node.parent.insert(child)
-            t_node.parent.children.remove(t_node)
+    # For each degenerate node u in the tree whose parent has the same type, replace u by its children.
+    # The nodes are collected first and then replaced bottom up, so that chains of such nodes collapse in one pass
+    # and every list of children is rebuilt at most once.
+    t_nodes = list(tree)
+    merged = {t_node for t_node in t_nodes
+              if t_node.parent is not None and t_node.type == t_node.parent.type and t_node.is_degenerate()}
+    if merged:
+        for t_node in reversed(t_nodes):
+            if any(child in merged for child in t_node.children):
+                children = []
+                for child in t_node.children:
+                    if child in merged:
+                        for grandchild in child.children:
+                            grandchild.parent = t_node
+                        children.extend(child.children)
+                    else:
+                        children.append(child)
+                t_node.children = children
 
     # Return the modular decomposition tree for G
     return tree
@@ -5,95 +5,204 @@ This module implements various functions for testing the implementation.
 
 from graph_generators import *
 from md import *
-from time import time
+from array import array
+from io import StringIO
+from itertools import groupby
+from math import comb
+from time import perf_counter_ns
 import sys
-import scipy.special
 import cProfile
+import hashlib
+import multiprocessing
+import os
+import pickle
 import random
+import tempfile
+
+
+# Directory in which the generated graphs are stored, so that repeated runs time md_tree on the same graphs
+GRAPH_CACHE_DIR = "./graph_cache"
+
+# The version of the layout of the cached graphs; it is part of the file names, so that older files are not misread
+GRAPH_CACHE_VERSION = 2
+
+
+def cached_graph(key, builder):  # the graph for 'key'; built by 'builder()' on the first run, loaded afterwards
+    key_hash = hashlib.blake2b(repr((GRAPH_CACHE_VERSION, key)).encode()).hexdigest()
+    cache_path = os.path.join(GRAPH_CACHE_DIR, key_hash + ".pkl")
+
+    # the graph is stored as its node ids and its edges (as a flat array of pairs of indices into the node ids):
+    # pickling the nodes themselves would recurse along the edges
+    if os.path.exists(cache_path):
+        try:
+            with open(cache_path, 'rb') as cache_file:
+                node_ids, edges = pickle.load(cache_file)
+        except (EOFError, pickle.UnpicklingError):
+            pass  # a damaged file (e.g. left behind by an interrupted run) is treated as missing and rebuilt
+        else:
+            return Graph.from_edge_list(node_ids, zip(edges[0::2], edges[1::2]))
+
+    graph = builder()
+    node_ids = list(graph.nodes)
+    node_index = {node: i for i, node in enumerate(graph.get_nodes())}
+
+    # 16 bits per index suffice for all the test graphs, which halves the size of the file
+    edges = array('H' if len(node_ids) <= 1 << 16 else 'I')
+    for node, i in node_index.items():
+        for neighbor in node.adjacent:
+            j = node_index[neighbor]
+            if j > i:
+                edges.append(i)
+                edges.append(j)
+
+    # the graph is written to a temporary file first, which then replaces the cache file in one step:
+    # an interrupted run cannot leave a truncated file behind under the name of the cache file
+    os.makedirs(GRAPH_CACHE_DIR, exist_ok=True)
+    temp_fd, temp_path = tempfile.mkstemp(suffix=".tmp", dir=GRAPH_CACHE_DIR)
+    try:
+        with os.fdopen(temp_fd, 'wb') as cache_file:
+            pickle.dump((node_ids, edges), cache_file, pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, cache_path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    return graph
+
+
+def prim_cell(cell):  # the share of 1000 random graphs with a fixed order and edge probability, that are prime
+    n, p = cell
+    prim_count = 0
+    for i in range(1000):
+        graph, _ = random_graph(n, p / 100)
+        tree = md_tree(graph)
+        if tree.type == Type.PRIME and len(tree.children) == n:
+            prim_count += 1
+    return n, p, prim_count/1000
+
+
+def prim_test():  # nothing is timed here, so the cells run on all cores
+    run_cells(prim_cell, [(n, p) for n in [10, 100, 1000] for p in range(0, 101, 1)], workers=os.cpu_count())
+
+
+def run_cells(cell, cells, workers):  # run 'cell' on each of the cells in 'workers' processes; results printed in order
+    # the timing sweeps run on a single worker (in this process): timings taken on all cores at once pick up
+    # contention for caches and memory bandwidth as well as frequency scaling, and do not compare with each other
+    # or with earlier results
+    if workers == 1:
+        write_results(cells, map(cell, cells))
+        return
+
+    # the workers are forked, so they share the imported modules, but each seeds its own random number generator
+    with multiprocessing.get_context('fork').Pool(workers, initializer=random.seed) as pool:
+        write_results(cells, pool.imap(cell, cells))
+
+
+def write_results(cells, results):  # the results are written at once for each value of the first (outer) parameter
+    for _, group in groupby(zip(cells, results), key=lambda item: item[0][0]):
+        rows = StringIO()
+        for _, result in group:
+            print(*result, file=rows)
+        sys.stdout.write(rows.getvalue())
+        sys.stdout.flush()
+
+
+def m_cell(cell):  # time md_tree on 5 graphs with a fixed number of nodes and a fixed edge probability
+    graph_order, edge_probability = cell
+    total_time = 0  # nanoseconds
+    for i in range(5):
+        graph = cached_graph(('random_graph', graph_order, edge_probability / 100, i),
+                             lambda: random_graph(graph_order, edge_probability / 100)[0])
+        begin = perf_counter_ns()
+        md_tree(graph)
+        end = perf_counter_ns()
+        total_time += end - begin
+    return graph_order, edge_probability, total_time / 5 / 1e9
 
 
-def prim_test():
-    for n in [10, 100, 1000]:
-        for p in range(0, 101, 1):
-            prim_count = 0
-            for i in range(1000):
-                graph, _ = random_graph(n, p / 100)
-                tree = md_tree(graph)
-                if tree.type == Type.PRIME and len(tree.children) == n:
-                    prim_count += 1
-            print(n, p, prim_count/1000)
-            sys.stdout.flush()
+def test_m():  # fixed number of nodes; vary the edge probability
+    run_cells(m_cell, [(graph_order, edge_probability)
+                       for graph_order in range(1000, 6000, 1000) for edge_probability in range(5, 100, 5)],
+              workers=1)
 
 
-def test_m():  # fixed number of nodes; vary the edge probability
-    for graph_order in range(1000, 6000, 1000):
-        for edge_probability in range(5, 100, 5):
-            total_time = 0
-            for i in range(5):
-                graph, _ = random_graph(graph_order, edge_probability/100)
-                begin = time()
-                md_tree(graph)
-                end = time()
-                total_time += end - begin
-            print(graph_order, edge_probability, total_time / 5)
-            sys.stdout.flush()
+def n_cell(cell):  # time md_tree on 5 graphs with a fixed number of edges and a fixed number of nodes
+    m, n = cell
+    total_time = 0  # nanoseconds
+    p = m / comb(n, 2)
+    for i in range(5):
+        graph = cached_graph(('random_graph', n, p, i), lambda: random_graph(n, p)[0])
+        begin = perf_counter_ns()
+        md_tree(graph)
+        end = perf_counter_ns()
+        total_time += end - begin
+    return n, m, total_time / 5 / 1e9
 
 
 def test_n():  # fixed number of edges; vary the number of nodes
-    for m in range(50000, 550000, 100000):
-        for n in range(1000, 5200, 200):
-            total_time = 0
-            p = m / scipy.special.comb(n, 2)
-            for i in range(5):
-                graph, _ = random_graph(n, p)
-                begin = time()
-                md_tree(graph)
-                end = time()
-                total_time += end - begin
-            print(n, m, total_time / 5)
-            sys.stdout.flush()
+    run_cells(n_cell, [(m, n) for m in range(50000, 550000, 100000) for n in range(1000, 5200, 200)], workers=1)
 
 
-def test_mw():  # modular width test; vary mw/md for graph with n = 1000, m ≈ 249750
+# The characters for the assembly modes in the output of test_mw
+MODE_CHARS = {Mode.RANDOM: 'r', Mode.DEEP: 'd', Mode.WIDE: 'w'}
+
+
+def mw_test_graph(mw, md):
+    """A function that generates a graph for 'test_mw()' with n = 1000 and m ≈ 249750 (modular width mw, mode md).
+
+    Note:
+        Each graph starts from an edge probability p drawn uniformly from [0.25, 0.75], but p is then steered
+        towards m ≈ 249750 instead of being drawn anew for every attempt. The accepted graphs therefore do not
+        follow the same distribution as graphs from independent uniform draws of p, and the results of 'test_mw()'
+        are not directly comparable to results measured on such graphs.
+    """
+
     m_opt = 249750  # m(G(n=1000, p=0.5))
     e = 0.05  # error
+
+    # after each rejected graph, p is moved by a step proportional to the relative error of m.
+    # the steps shrink (the number of edges varies a lot between graphs with the same p), and a little noise keeps
+    # the graphs diverse.
+    p = random.uniform(0.25, 0.75)
+    step = 0.25
+    while 1:
+        if mw > 0:
+            graph, _ = mw_bound_graph2(graph_order=1000, lo_mw_bound=mw, hi_mw_bound=mw,
+                                       edge_probability=p, mode=md)
+        else:  # cograph
+            graph, _ = mw_bound_graph2(graph_order=1000, lo_mw_bound=2, hi_mw_bound=2,
+                                       edge_probability=p, mode=md)
+
+        m = sum(len(node.adjacent) for node in graph.get_nodes()) // 2  # count edges (each is in two adjacency sets)
+
+        if (m_opt - m_opt * e) <= m <= (m_opt + m_opt * e):  # e = 0.05: 237262.5 <= m <= 262237.5
+            return graph
+
+        p = min(max(p + step * (m_opt - m) / m_opt + random.gauss(0, 0.01), 0.25), 0.75)
+        step = max(step * 0.8, 0.02)
+
+
+def mw_cell(cell):  # time md_tree on 10 graphs with a fixed modular width and a fixed assembly mode
+    md, mw = cell
     runs = 10
 
-    for md in [Mode.RANDOM, Mode.DEEP, Mode.WIDE]:
-        for mw in range(0, 1010, 10):
-            total_time = 0
-            for i in range(runs):
-                while 1:
-                    p = random.uniform(0.25, 0.75)
-                    if mw > 0:
-                        graph, _ = mw_bound_graph2(graph_order=1000, lo_mw_bound=mw, hi_mw_bound=mw,
-                                                   edge_probability=p, mode=md)
-                    else:  # cograph
-                        graph, _ = mw_bound_graph2(graph_order=1000, lo_mw_bound=2, hi_mw_bound=2,
-                                                   edge_probability=p, mode=md)
-
-                    m = 0  # count edges
-                    for node in graph.get_nodes():
-                        for neighbor in node.adjacent:
-                            if neighbor.id > node.id:
-                                m += 1
-
-                    if (m_opt - m_opt * e) <= m <= (m_opt + m_opt * e):  # e = 0.05: 474525 <= m <= 524475
-                        begin = time()
-                        md_tree(graph)
-                        end = time()
-                        total_time += end - begin
-                        break
-
-            if md == Mode.RANDOM:
-                mode = 'r'
-            if md == Mode.DEEP:
-                mode = 'd'
-            if md == Mode.WIDE:
-                mode = 'w'
-
-            print(mode, mw, total_time / runs)
-            sys.stdout.flush()
+    total_time = 0  # nanoseconds
+    for i in range(runs):
+        graph = cached_graph(('mw_test_graph', 1000, mw, md, i), lambda: mw_test_graph(mw, md))
+        begin = perf_counter_ns()
+        md_tree(graph)
+        end = perf_counter_ns()
+        total_time += end - begin
+
+    return MODE_CHARS[md], mw, total_time / runs / 1e9
+
+
+def test_mw():  # modular width test; vary mw/md for graph with n = 1000, m ≈ 249750
+    run_cells(mw_cell, [(md, mw) for md in [Mode.RANDOM, Mode.DEEP, Mode.WIDE] for mw in range(0, 1010, 10)],
+              workers=1)
+
+
+def warm_up():  # run md_tree once on a small graph, so that the timed calls do not pay for any first-call costs
+    md_tree(random_graph(8, 0.5)[0])
 
 
 def test_mode(mode):
@@ -105,6 +214,7 @@ def test_mode(mode):
     }
 
     test = switcher.get(mode, lambda: "Invalid arguments")
+    warm_up()  # before any workers are forked, so that they inherit the warm state
     test()
 
 
@@ -0,0 +1,105 @@
+"""Tests for the modular decomposition.
+
+This module checks the trees computed by 'md_tree()' against a brute-force computation of the strong modules of
+small graphs. Run with 'python -m unittest test_md'.
+"""
+
+import random
+import unittest
+from itertools import combinations
+
+from md import Graph, Node, Type, md_tree
+
+
+def random_graph(seed, max_order=8):  # a random graph, which is built from smaller random graphs for odd seeds
+    rng = random.Random(seed)
+    graph_order = rng.randint(1, max_order)
+    edge_probability = rng.random()
+
+    graph = Graph()
+    for u in range(graph_order):
+        graph.add_node(Node(str(u)))
+
+    if seed % 2 == 0:
+        for u, v in combinations(range(graph_order), 2):
+            if rng.random() < edge_probability:
+                graph.add_edge(str(u), str(v))
+        return graph
+
+    # assign the nodes to random groups, which become modules: inside a group the edges are random,
+    # between two groups either all or no edges are present
+    group = [rng.randrange(max(1, graph_order // 2)) for _ in range(graph_order)]
+    group_edges = {}
+    for u, v in combinations(range(graph_order), 2):
+        if group[u] == group[v]:
+            connected = rng.random() < edge_probability
+        else:
+            pair = (min(group[u], group[v]), max(group[u], group[v]))
+            if pair not in group_edges:
+                group_edges[pair] = rng.random() < edge_probability
+            connected = group_edges[pair]
+        if connected:
+            graph.add_edge(str(u), str(v))
+    return graph
+
+
+def strong_modules(graph):  # all strong modules of a graph (as sets of node ids), found by trying every subset
+    adjacent = {node.id: {neighbor.id for neighbor in node.adjacent} for node in graph.get_nodes()}
+    node_ids = list(adjacent)
+
+    modules = []
+    for size in range(1, len(node_ids) + 1):
+        for subset in combinations(node_ids, size):
+            module = frozenset(subset)
+            # every node outside of the module is adjacent to either all or none of its nodes
+            if all(module <= adjacent[v] or not module & adjacent[v] for v in node_ids if v not in module):
+                modules.append(module)
+
+    # a module is strong, if it does not overlap any other module
+    return {m for m in modules if not any(m & n and not m <= n and not n <= m for n in modules)}
+
+
+# seeds of 'random_graph(seed, max_order=12)', for which marks left behind by 'tree_refinement()' used to stop the
+# marking of later leaves, so that 'md_tree()' missed strong modules
+STALE_MARK_SEEDS = [27, 1380]
+
+
+def leaf_ids(t_node):
+    return frozenset(leaf.node.id for leaf in t_node.leaves())
+
+
+class MdTreeTest(unittest.TestCase):
+
+    def assert_md_tree(self, graph):
+        tree = md_tree(graph)
+        adjacent = {node.id: {neighbor.id for neighbor in node.adjacent} for node in graph.get_nodes()}
+
+        # the nodes of the tree are exactly the strong modules
+        self.assertEqual({leaf_ids(t_node) for t_node in tree}, strong_modules(graph))
+
+        # the type of an inner node is determined by the quotient graph on its children
+        for t_node in tree:
+            if t_node.type is Type.NODE:
+                continue
+            representatives = [next(iter(leaf_ids(child))) for child in t_node.children]
+            edges = [v in adjacent[u] for u, v in combinations(representatives, 2)]
+            if all(edges):
+                self.assertIs(t_node.type, Type.SERIES)
+            elif not any(edges):
+                self.assertIs(t_node.type, Type.PARALLEL)
+            else:
+                self.assertIs(t_node.type, Type.PRIME)
+
+    def test_random_graphs(self):
+        for seed in range(500):
+            with self.subTest(seed=seed):
+                self.assert_md_tree(random_graph(seed))
+
+    def test_stale_marks(self):
+        for seed in STALE_MARK_SEEDS:
+            with self.subTest(seed=seed):
+                self.assert_md_tree(random_graph(seed, max_order=12))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,6 +4,11 @@ This module implements a text-based user interface for using the modular decompo
 """
 
 import npyscreen
+from concurrent.futures import ThreadPoolExecutor
+import os
+import pickle
+import tempfile
+from graphviz import view
 from dot import path_to_dot, dot_to_graph, tree_to_dot, render_graph, render_from_source
 from md import md_tree
 import time
@@ -11,6 +16,85 @@ from graph_generators import *
 
 engine = "dot"  # The default engine for rendering a graph
 
+# The assembly modes selectable for 'Generator B' (by their index in the form), 'RANDOM' being the default
+GENERATOR_MODES = {1: Mode.WIDE, 2: Mode.DEEP}
+
+# Renders the input graphs in the background (Graphviz runs in its own process), while their modular decomposition
+# is computed
+renderer = ThreadPoolExecutor(max_workers=2)
+
+# The graphs rendered during this session: maps the path of a .pdf-file to the engine and the modification time of
+# the .dot-file it was rendered with
+rendered_graphs = {}
+
+
+def render_graph_if_stale(dot_path, graph_name, engine_):
+    """A function that renders a graph like 'render_graph()' and shows it, but only if it has not been rendered
+    already during this session, with the same engine and from the same version of its .dot-file.
+    Otherwise, the existing .pdf-file is shown.
+
+    Args:
+        dot_path: The path to the graph.
+        graph_name: The name of the graph used for naming the .dot-file.
+        engine_: The rendering program used for rendering the graph.
+    """
+
+    pdf_path = "./graphs/" + graph_name + ".dot.pdf"
+    rendered_with = (engine_, os.path.getmtime(dot_path))
+    if rendered_graphs.get(pdf_path) == rendered_with and os.path.exists(pdf_path):
+        view(pdf_path)
+    else:
+        render_graph(dot_path, graph_name, engine_, show=True)
+        rendered_graphs[pdf_path] = rendered_with
+
+
+# The file in which the parsed small graphs are stored (see 'load_small_graphs()')
+SMALL_GRAPHS_CACHE = "./small_graphs_dot/small_graphs.pkl"
+
+
+def load_small_graphs(graph_names):
+    """A function that reads and parses the graphs from './small_graphs_dot/'.
+
+    The graphs never change, so after they have been parsed once, they are stored in a single file
+    ('SMALL_GRAPHS_CACHE') and loaded from there at once. The file is rebuilt, if a graph is missing in it,
+    if a .dot-file is newer than the file or if the file cannot be read.
+
+    Note:
+        'md_tree()' modifies the nodes of a graph, so the returned graphs must not be used directly, but be cloned.
+
+    Args:
+        graph_names: The names of the graphs (without the file extension).
+
+    Returns:
+        A dictionary mapping the names of the graphs to 'Graph' objects representing the graphs.
+    """
+
+    dot_paths = {graph_name: "./small_graphs_dot/" + graph_name + ".dot" for graph_name in graph_names}
+
+    if os.path.exists(SMALL_GRAPHS_CACHE):
+        cache_time = os.path.getmtime(SMALL_GRAPHS_CACHE)
+        if all(os.path.getmtime(dot_path) <= cache_time for dot_path in dot_paths.values()):
+            try:
+                with open(SMALL_GRAPHS_CACHE, 'rb') as cache_file:
+                    small_graphs = pickle.load(cache_file)
+            except (EOFError, pickle.UnpicklingError):
+                small_graphs = {}  # A damaged file is rebuilt
+            if all(graph_name in small_graphs for graph_name in graph_names):
+                return small_graphs
+
+    small_graphs = {graph_name: dot_to_graph(path_to_dot(dot_path)) for graph_name, dot_path in dot_paths.items()}
+
+    # Write to a temporary file that then replaces the file, so that an interrupted write leaves no truncated file
+    temp_fd, temp_path = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(SMALL_GRAPHS_CACHE))
+    try:
+        with os.fdopen(temp_fd, 'wb') as cache_file:
+            pickle.dump(small_graphs, cache_file, pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, SMALL_GRAPHS_CACHE)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    return small_graphs
+
 
 # Four form classes for the different forms (screens)
 class MainForm(npyscreen.FormBaseNew, npyscreen.SplitForm):
@@ -197,87 +281,38 @@ class GeneratorForm(npyscreen.FormBaseNew, npyscreen.SplitForm):
                              max_width=40,
                              scroll_exit=True) # 10
 
+        # The widgets belonging to each generator (shown/hidden together, see 'GeneratorSelect')
+        self.gen_a = [self.order, self.prob]
+        self.gen_b = [self.order2, self.prob2, self.min_mw, self.max_mw, self.mode]
+
         self.runbutton = self.add(RunButton4, name='Run ►', rely=-3, relx=3, color='IMPORTANT')
         self.menubutton = self.add(MenuButton, name='Menu', rely=-3, relx=-19)
         self.quitbutton = self.add(QuitButton, name='Quit', rely=-3, relx=-11)
 
 class GeneratorSelect(npyscreen.SelectOne):
     def when_value_edited(self):
+        form = self.parent.parentApp.getForm('GENERATOR')  # looked up once
         try:
-            gen_choice = self.parent.parentApp.getForm('GENERATOR').choice.value[0]
+            gen_choice = form.choice.value[0]
         except:
             gen_choice = None
         # depending on the case, hide/display (make them editable/not editable) the widgets
         if gen_choice == 0:  # Generator A
-            self.parent.parentApp.getForm('GENERATOR').order.hidden = False
-            self.parent.parentApp.getForm('GENERATOR').prob.hidden = False
-            self.parent.parentApp.getForm('GENERATOR').order.editable = True
-            self.parent.parentApp.getForm('GENERATOR').prob.editable = True
-
-            self.parent.parentApp.getForm('GENERATOR').order2.hidden = True
-            self.parent.parentApp.getForm('GENERATOR').prob2.hidden = True
-            self.parent.parentApp.getForm('GENERATOR').min_mw.hidden = True
-            self.parent.parentApp.getForm('GENERATOR').max_mw.hidden = True
-            self.parent.parentApp.getForm('GENERATOR').mode.hidden = True
-            self.parent.parentApp.getForm('GENERATOR').order2.editable = False
-            self.parent.parentApp.getForm('GENERATOR').prob2.editable = False
-            self.parent.parentApp.getForm('GENERATOR').min_mw.editable = False
-            self.parent.parentApp.getForm('GENERATOR').max_mw.editable = False
-            self.parent.parentApp.getForm('GENERATOR').mode.editable = False
-
-            self.parent.parentApp.getForm('GENERATOR').order2.update()
-            self.parent.parentApp.getForm('GENERATOR').prob2.update()
-            self.parent.parentApp.getForm('GENERATOR').min_mw.update()
-            self.parent.parentApp.getForm('GENERATOR').max_mw.update()
-            self.parent.parentApp.getForm('GENERATOR').mode.update()
-
-            self.parent.parentApp.getForm('GENERATOR').order.update()
-            self.parent.parentApp.getForm('GENERATOR').prob.update()
-
-
+            show, hide = form.gen_a, form.gen_b
         elif gen_choice == 1:  # Generator B
-            self.parent.parentApp.getForm('GENERATOR').order.hidden = True
-            self.parent.parentApp.getForm('GENERATOR').prob.hidden = True
-            self.parent.parentApp.getForm('GENERATOR').order.editable = False
-            self.parent.parentApp.getForm('GENERATOR').prob.editable = False
-
-            self.parent.parentApp.getForm('GENERATOR').order2.hidden = False
-            self.parent.parentApp.getForm('GENERATOR').prob2.hidden = False
-            self.parent.parentApp.getForm('GENERATOR').min_mw.hidden = False
-            self.parent.parentApp.getForm('GENERATOR').max_mw.hidden = False
-            self.parent.parentApp.getForm('GENERATOR').mode.hidden = False
-            self.parent.parentApp.getForm('GENERATOR').order2.editable = True
-            self.parent.parentApp.getForm('GENERATOR').prob2.editable = True
-            self.parent.parentApp.getForm('GENERATOR').min_mw.editable = True
-            self.parent.parentApp.getForm('GENERATOR').max_mw.editable = True
-            self.parent.parentApp.getForm('GENERATOR').mode.editable = True
-
-            self.parent.parentApp.getForm('GENERATOR').order.update()
-            self.parent.parentApp.getForm('GENERATOR').prob.update()
-
-            self.parent.parentApp.getForm('GENERATOR').order2.update()
-            self.parent.parentApp.getForm('GENERATOR').prob2.update()
-            self.parent.parentApp.getForm('GENERATOR').min_mw.update()
-            self.parent.parentApp.getForm('GENERATOR').max_mw.update()
-            self.parent.parentApp.getForm('GENERATOR').mode.update()
+            show, hide = form.gen_b, form.gen_a
+        else:
+            show, hide = [], form.gen_a + form.gen_b
 
+        for widget in show:
+            widget.hidden = False
+            widget.editable = True
+        for widget in hide:
+            widget.hidden = True
+            widget.editable = False
 
-        else:
-            self.parent.parentApp.getForm('GENERATOR').order.hidden = True
-            self.parent.parentApp.getForm('GENERATOR').prob.hidden = True
-            self.parent.parentApp.getForm('GENERATOR').order.editable = False
-            self.parent.parentApp.getForm('GENERATOR').prob.editable = False
-
-            self.parent.parentApp.getForm('GENERATOR').order2.hidden = True
-            self.parent.parentApp.getForm('GENERATOR').prob2.hidden = True
-            self.parent.parentApp.getForm('GENERATOR').min_mw.hidden = True
-            self.parent.parentApp.getForm('GENERATOR').max_mw.hidden = True
-            self.parent.parentApp.getForm('GENERATOR').mode.hidden = True
-            self.parent.parentApp.getForm('GENERATOR').order2.editable = False
-            self.parent.parentApp.getForm('GENERATOR').prob2.editable = False
-            self.parent.parentApp.getForm('GENERATOR').min_mw.editable = False
-            self.parent.parentApp.getForm('GENERATOR').max_mw.editable = False
-            self.parent.parentApp.getForm('GENERATOR').mode.editable = False
+        # redraw the form once, instead of updating every widget on its own
+        form.display()
 
 
 # Custom widget classes (text-boxes, buttons, etc.)
@@ -306,19 +341,20 @@ class RunButton1(npyscreen.ButtonPress):  # Path-form
         name = path_str[path_str.rindex('/') + 1:path_str.rindex('.')]
         graph_name = name
         if engine != "No rendering":
-            render_graph(path_str, graph_name, engine, show=True)
+            graph_rendering = renderer.submit(render_graph_if_stale, path_str, graph_name, engine)
         else:
-            render_graph(path_str, graph_name, show=False)
+            graph_rendering = renderer.submit(render_graph, path_str, graph_name, show=False)
         tree_name = name + '_mdt'
         dot_str = path_to_dot(path_str)
         graph = dot_to_graph(dot_str)
-        md_start = time.time()
+        md_start = time.perf_counter()
         tree = md_tree(graph)
-        md_end = time.time()
+        md_end = time.perf_counter()
         if engine != "No rendering":
             tree_to_dot(tree, tree_name)
         else:
             tree_to_dot(tree, tree_name, show=False)
+        graph_rendering.result()  # Wait for the graph to be rendered (and raise its errors, if any)
         npyscreen.notify_confirm("Calculation time: " + str(md_end - md_start) + ' seconds', title=None, wrap=True)
 
 
@@ -328,24 +364,24 @@ class RunButton2(npyscreen.ButtonPress):
     def whenPressed(self):
         """A function the starts the the modular decomposition algorithm with a graph (from the small graph examples)
         selected by the user. """
-        graph_name_idx = self.parent.parentApp.getForm('SMALLGRAPHS').choice.value[0]
-        graph_name = self.parent.parentApp.getForm('SMALLGRAPHS').choice.values[graph_name_idx]
+        choice = self.parent.parentApp.getForm('SMALLGRAPHS').choice
+        graph_name = choice.values[choice.value[0]]
         # print(graph_name)
         path_str = "./small_graphs_dot/" + graph_name + ".dot"
         if engine != "No rendering":
-            render_graph(path_str, graph_name, engine, show=True)
+            graph_rendering = renderer.submit(render_graph_if_stale, path_str, graph_name, engine)
         else:
-            render_graph(path_str, graph_name, show=False)
+            graph_rendering = renderer.submit(render_graph, path_str, graph_name, show=False)
         tree_name = graph_name + '_mdt'
-        dot_str = path_to_dot(path_str)
-        graph = dot_to_graph(dot_str)
-        md_start = time.time()
+        graph = self.parent.parentApp.small_graphs[graph_name].clone()
+        md_start = time.perf_counter()
         tree = md_tree(graph)
-        md_end = time.time()
+        md_end = time.perf_counter()
         if engine != "No rendering":
             tree_to_dot(tree, tree_name)
         else:
             tree_to_dot(tree, tree_name, show=False)
+        graph_rendering.result()  # Wait for the graph to be rendered (and raise its errors, if any)
         npyscreen.notify_confirm("Calculation time: " + str(md_end - md_start) + ' seconds', title=None, wrap=True)
 
 
@@ -358,18 +394,19 @@ class RunButton3(npyscreen.ButtonPress):
         graph_str = self.parent.parentApp.getForm('EDITOR').editor.value
         source_str = 'graph{' + graph_str + '}'
         if engine != "No rendering":
-            render_from_source(source_str, engine)
+            graph_rendering = renderer.submit(render_from_source, source_str, engine)
         else:
-            render_from_source(source_str, show=False)
+            graph_rendering = renderer.submit(render_from_source, source_str, show=False)
         graph = dot_to_graph(source_str)
-        md_start = time.time()
+        md_start = time.perf_counter()
         tree = md_tree(graph)
-        md_end = time.time()
+        md_end = time.perf_counter()
 
         if engine != "No rendering":
             tree_to_dot(tree, "your_md_tree")
         else:
             tree_to_dot(tree, "your_md_tree", show=False)
+        graph_rendering.result()  # Wait for the graph to be rendered (and raise its errors, if any)
         npyscreen.notify_confirm("Calculation time: " + str(md_end - md_start) + ' seconds', title=None, wrap=True)
 
 
@@ -379,40 +416,41 @@ class RunButton4(npyscreen.ButtonPress):
     def whenPressed(self):
         """A function the starts the the modular decomposition algorithm with a graph provided by the user
         input in the editor."""
+        form = self.parent.parentApp.getForm('GENERATOR')  # looked up once
         try:
-            gen_choice = self.parent.parentApp.getForm('GENERATOR').choice.value[0]
+            gen_choice = form.choice.value[0]
         except:
             gen_choice = None
 
         if gen_choice == 0:
             try:
-                g_order = int(self.parent.parentApp.getForm('GENERATOR').order.value)
-                g_prob = float(self.parent.parentApp.getForm('GENERATOR').prob.value)
+                g_order = int(form.order.value)
+                g_prob = float(form.prob.value)
 
                 # computing graph
-                g_start = time.time()
+                g_start = time.perf_counter()
                 g, g_name = random_graph(g_order, g_prob)
-                g_end = time.time()
+                g_end = time.perf_counter()
 
                 # rendering graph
-                rg_start = time.time()
+                rg_start = time.perf_counter()
                 if engine != "No rendering":
                     n, m = write_graph_to_dot(g, g_name, show=True, engine_=engine)
                 else:
                     n, m = write_graph_to_dot(g, g_name, show=False)
-                rg_end = time.time()
+                rg_end = time.perf_counter()
 
-                md_start = time.time()
+                md_start = time.perf_counter()
                 tree = md_tree(g)
-                md_end = time.time()
+                md_end = time.perf_counter()
 
                 t_name = g_name + "_mdt"
-                rt_start = time.time()
+                rt_start = time.perf_counter()
                 if engine != "No rendering":
                     tree_to_dot(tree, t_name, show=True)
                 else:
                     tree_to_dot(tree, t_name, show=False)
-                rt_end = time.time()
+                rt_end = time.perf_counter()
 
                 npyscreen.notify_confirm("|V| = " + str(n) + "  |E| = " + str(m) + "\n"
                                          + "------------------------------------------------------\n"
@@ -428,46 +466,41 @@ class RunButton4(npyscreen.ButtonPress):
 
         elif gen_choice == 1:
             try:
-                g_order2 = int(self.parent.parentApp.getForm('GENERATOR').order2.value)
-                g_prob2 = float(self.parent.parentApp.getForm('GENERATOR').prob2.value)
-                g_min_mw = int(self.parent.parentApp.getForm('GENERATOR').min_mw.value)
-                g_max_mw = int(self.parent.parentApp.getForm('GENERATOR').max_mw.value)
-                g_mode = self.parent.parentApp.getForm('GENERATOR').mode.value[0]
-
-                if g_mode == 1:  # WIDE
-                    mode = Mode.WIDE
-                elif g_mode == 2:  # DEEP
-                    mode = Mode.DEEP
-                else:   # RANDOM
-                    mode = Mode.RANDOM
+                g_order2 = int(form.order2.value)
+                g_prob2 = float(form.prob2.value)
+                g_min_mw = int(form.min_mw.value)
+                g_max_mw = int(form.max_mw.value)
+                g_mode = form.mode.value[0]
+
+                mode = GENERATOR_MODES.get(g_mode, Mode.RANDOM)
 
                 # computing graph
-                g_start = time.time()
+                g_start = time.perf_counter()
                 g, g_name = mw_bound_graph2(g_order2, g_min_mw, g_max_mw, g_prob2, mode)
-                g_end = time.time()
+                g_end = time.perf_counter()
 
                 # rendering graph
-                rg_start = time.time()
+                rg_start = time.perf_counter()
                 if engine != "No rendering":
                     n, m = write_graph_to_dot(g, g_name, show=True, engine_=engine)
                 else:
                     n, m = write_graph_to_dot(g, g_name, show=False)
-                rg_end = time.time()
+                rg_end = time.perf_counter()
 
                 # computing md tree
-                md_start = time.time()
+                md_start = time.perf_counter()
                 tree = md_tree(g)
-                md_end = time.time()
+                md_end = time.perf_counter()
 
                 t_name = g_name + "_mdt"
 
                 # rendering md tree
-                rt_start = time.time()
+                rt_start = time.perf_counter()
                 if engine != "No rendering":
                     tree_to_dot(tree, t_name, show=True)
                 else:
                     tree_to_dot(tree, t_name, show=False)
-                rt_end = time.time()
+                rt_end = time.perf_counter()
 
                 npyscreen.notify_confirm("|V| = " + str(n) + "  |E| = " + str(m) + "\n"
                                          + "------------------------------------------------------\n"
@@ -545,6 +578,9 @@ class App(npyscreen.NPSAppManaged):
         self.addForm('GENERATOR', GeneratorForm, name='MODULAR DECOMPOSITION')
         self.addForm('SETTINGS', SettingsForm, name='SETTINGS', lines=14, rely=20)
 
+        # Load the small graphs in advance, so that running one of them does not have to wait for the parser
+        self.small_graphs = load_small_graphs(self.getForm('SMALLGRAPHS').choice.values)
+
 
 if __name__ == '__main__':
     app = App()